@@ -1,63 +1,238 @@
 # backend/analyzer.py
 
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+import os
+import threading
+import time
+import numpy as np
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.preprocessing import normalize
 
-def extract_key_excerpts_by_similarity(full_content, title, num_excerpts=3):
+from local_state import LOCAL_STATE_DIR
+
+# Document frequencies of hashed terms over all paragraphs analyzed so far
+CORPUS_IDF_PATH = os.path.join(LOCAL_STATE_DIR, 'analyzer_idf.npz')
+HASHING_FEATURES = 2 ** 18
+# Minimum paragraph length (characters) worth analyzing
+MIN_PARAGRAPH_LENGTH = 150
+# 'tfidf' (lexical, default) or 'embedding' (sentence-transformer similarity)
+EXCERPT_MODE = os.getenv('EXCERPT_MODE', 'tfidf')
+# Document frequencies are halved when the saved state is older than this,
+# so the IDF follows shifts in vocabulary instead of freezing.
+IDF_REFRESH_DAYS = 7
+
+
+class CorpusIdf:
+    """
+    Corpus-level inverse document frequencies over hashed terms.
+
+    Paragraph document frequencies are accumulated across batches and runs
+    and persisted to disk, so every article is scored against IDF weights
+    from thousands of paragraphs instead of its own handful. Batches only
+    update the in-memory counts; save() writes them once per run.
+    """
+
+    def __init__(self, path=CORPUS_IDF_PATH, n_features=HASHING_FEATURES):
+        self.path = path
+        self.n_features = n_features
+        self._lock = threading.Lock()
+        self.doc_freq = np.zeros(n_features, dtype=np.float64)
+        self.n_docs = 0.0
+        self.updated_at = time.time()
+        self._dirty = False
+        if os.path.exists(path):
+            saved = np.load(path)
+            if saved['doc_freq'].shape[0] == n_features:
+                self.doc_freq = saved['doc_freq'].astype(np.float64)
+                self.n_docs = float(saved['n_docs'])
+                self.updated_at = float(saved['updated_at'])
+        self._refresh_if_stale()
+
+    def _refresh_if_stale(self):
+        if time.time() - self.updated_at > IDF_REFRESH_DAYS * 86400:
+            self.doc_freq *= 0.5
+            self.n_docs *= 0.5
+            self.updated_at = time.time()
+            self._dirty = True
+
+    def update(self, term_matrix):
+        """Adds the documents (rows) of a term-count matrix to the frequencies."""
+        with self._lock:
+            self.doc_freq += np.asarray((term_matrix > 0).sum(axis=0)).ravel()
+            self.n_docs += term_matrix.shape[0]
+            self._dirty = True
+
+    def idf(self):
+        """Smoothed IDF weights, as in sklearn's TfidfTransformer."""
+        with self._lock:
+            return np.log((1 + self.n_docs) / (1 + self.doc_freq)) + 1
+
+    def save(self):
+        """Writes the frequencies to disk if they changed; float32 halves the file."""
+        with self._lock:
+            if not self._dirty:
+                return
+            temp_path = self.path + '.tmp.npz'
+            np.savez(temp_path, doc_freq=self.doc_freq.astype(np.float32), n_docs=self.n_docs, updated_at=self.updated_at)
+            os.replace(temp_path, self.path)
+            self._dirty = False
+
+
+_hashing_vectorizer = HashingVectorizer(
+    n_features=HASHING_FEATURES, stop_words='english', alternate_sign=False, norm=None
+)
+_corpus_idf = None
+_corpus_idf_lock = threading.Lock()
+
+
+def get_corpus_idf():
+    """Returns the shared corpus IDF, loading it from disk on first use."""
+    global _corpus_idf
+    if _corpus_idf is None:
+        with _corpus_idf_lock:
+            if _corpus_idf is None:
+                _corpus_idf = CorpusIdf()
+    return _corpus_idf
+
+
+def save_corpus_idf():
+    """Persists the shared corpus IDF, if this process loaded and updated it."""
+    if _corpus_idf is not None:
+        _corpus_idf.save()
+
+
+def split_paragraphs(full_content):
+    return [p.strip() for p in full_content.split('\n') if len(p.strip()) > MIN_PARAGRAPH_LENGTH]
+
+
+def extract_key_excerpts_batch(articles, num_excerpts=3, corpus_idf=None):
+    """
+    Extracts key excerpts for many articles at once.
+
+    All titles and paragraphs are hashed into one sparse matrix, weighted by
+    the shared corpus IDF (updated with this batch's paragraphs), and every
+    paragraph is scored against its own article's title in a single sparse
+    row-wise product. Safe to call concurrently from worker threads. The
+    updated frequencies are kept in memory; call save_corpus_idf() once the
+    run is done.
+
+    Args:
+        articles (list): (title, full_content) pairs.
+        num_excerpts (int): The number of top paragraphs to extract per article.
+
+    Returns:
+        list: For each article, the joined excerpts, or the original content
+              if it is too short or has no usable terms.
+    """
+    corpus_idf = corpus_idf or get_corpus_idf()
+    results = [content for _, content in articles]
+
+    # 1. Segment every analyzable article into paragraphs
+    titles, paragraphs, owners, analyzed = [], [], [], []
+    for index, (title, content) in enumerate(articles):
+        article_paragraphs = split_paragraphs(content or '')
+        if len(article_paragraphs) < num_excerpts:
+            continue
+        analyzed.append((index, len(paragraphs), article_paragraphs))
+        titles.append(title or '')
+        paragraphs.extend(article_paragraphs)
+        owners.extend([len(titles) - 1] * len(article_paragraphs))
+
+    skipped = len(articles) - len(analyzed)
+    if skipped:
+        print(f"  - {skipped} article(s) without enough content to analyze. Using full content.")
+    if not analyzed:
+        return results
+
+    # 2. Hash, update the corpus document frequencies, then weight by IDF
+    paragraph_counts = _hashing_vectorizer.transform(paragraphs)
+    corpus_idf.update(paragraph_counts)
+    idf = corpus_idf.idf()
+    paragraph_vectors = normalize(paragraph_counts.multiply(idf).tocsr())
+    title_vectors = normalize(_hashing_vectorizer.transform(titles).multiply(idf).tocsr())
+
+    # 3. Cosine similarity of each paragraph with its own article's title
+    similarities = np.asarray(paragraph_vectors.multiply(title_vectors[owners]).sum(axis=1)).ravel()
+
+    # 4. Select the top N paragraphs per article, kept in their original order
+    for title_index, (index, start, article_paragraphs) in enumerate(analyzed):
+        if title_vectors[title_index].nnz == 0:
+            # Title is only stop words or symbols; nothing to compare against.
+            continue
+        scores = similarities[start:start + len(article_paragraphs)]
+        top_indices = np.sort(scores.argsort()[-num_excerpts:])
+        results[index] = "\n\n---\n\n".join(article_paragraphs[i] for i in top_indices)
+
+    print(f"  - Extracted key excerpts for {len(analyzed)} articles in one batch.")
+    return results
+
+
+def extract_key_excerpts_by_embedding_batch(articles, num_excerpts=3, batch_size=64):
     """
-    Analyzes article content to find the paragraphs most similar to the title.
+    Extracts key excerpts by semantic similarity to the title.
 
-    This function uses a TF-IDF (Term Frequency-Inverse Document Frequency)
-    vectorizer to understand word importance and cosine similarity to measure
-    relevance between the title and each paragraph.
+    Titles and paragraphs of all articles are embedded in one batched
+    encode() call with the same sentence-transformer used for
+    categorization. The top paragraphs by cosine similarity are kept, and
+    the mean of their vectors (re-normalized) becomes the article's
+    embedding, so categorization needs no second model pass.
 
     Args:
-        full_content (str): The complete text of the article.
-        title (str): The title of the article.
-        num_excerpts (int): The number of top paragraphs to extract.
+        articles (list): (title, full_content) pairs.
 
     Returns:
-        str: A string containing the most relevant paragraphs, separated by
-             newlines, or the original content if it's too short to analyze.
-    """
-    # 1. Segment the article into paragraphs. We filter for paragraphs of a
-    #    meaningful length to avoid analyzing stray lines or headings.
-    paragraphs = [p.strip() for p in full_content.split('\n') if len(p.strip()) > 150]
-
-    # Edge Case: If there aren't enough paragraphs to choose from,
-    # it's safer to return the whole article than an incorrect summary.
-    if len(paragraphs) < num_excerpts:
-        print("  - Not enough content to perform analysis. Using full content.")
-        return full_content
-
-    # 2. Vectorize the content using TF-IDF. The title is included in the list
-    #    so it can be compared against the paragraphs.
-    documents = [title] + paragraphs
-    
-    try:
-        tfidf_vectorizer = TfidfVectorizer(stop_words='english', max_features=5000)
-        tfidf_matrix = tfidf_vectorizer.fit_transform(documents)
-    except ValueError:
-        # This can happen if the content is just stop words or symbols.
-        print("  - TF-IDF Vectorization failed. Using full content.")
-        return full_content
-
-    # The first vector (index 0) is the title. The rest are paragraphs.
-    title_vector = tfidf_matrix[0:1]
-    paragraph_vectors = tfidf_matrix[1:]
-
-    # 3. Calculate the cosine similarity between the title and each paragraph.
-    similarities = cosine_similarity(title_vector, paragraph_vectors).flatten()
-
-    # 4. Select the top N paragraphs. We get the indices of the 'num_excerpts'
-    #    highest scores.
-    top_indices = similarities.argsort()[-num_excerpts:]
-    
-    # Sort the indices so the paragraphs are returned in their original order.
-    top_indices.sort()
-
-    # Join the selected paragraphs into a single string.
-    top_excerpts = [paragraphs[i] for i in top_indices]
-    
-    print(f"  - Successfully extracted {len(top_excerpts)} key excerpts.")
-    return "\n\n---\n\n".join(top_excerpts)
\ No newline at end of file
+        list: (excerpt_text, pooled_vector) per article; pooled_vector is
+              None when the full content was returned unanalyzed.
+    """
+    from embedding_utils import get_embedding_model, store_embeddings
+
+    results = [(content, None) for _, content in articles]
+
+    texts, analyzed = [], []
+    for index, (title, content) in enumerate(articles):
+        article_paragraphs = split_paragraphs(content or '')
+        if len(article_paragraphs) < num_excerpts or not title:
+            continue
+        analyzed.append((index, len(texts), article_paragraphs))
+        texts.append(title)
+        texts.extend(article_paragraphs)
+
+    skipped = len(articles) - len(analyzed)
+    if skipped:
+        print(f"  - {skipped} article(s) without enough content to analyze. Using full content.")
+    if not analyzed:
+        return results
+
+    vectors = np.asarray(get_embedding_model().encode(texts, batch_size=batch_size), dtype=np.float32)
+    vectors = normalize(vectors)
+
+    excerpt_texts, pooled_vectors = [], []
+    for index, start, article_paragraphs in analyzed:
+        title_vector = vectors[start]
+        paragraph_vectors = vectors[start + 1:start + 1 + len(article_paragraphs)]
+        similarities = paragraph_vectors @ title_vector
+        top_indices = np.sort(similarities.argsort()[-num_excerpts:])
+
+        excerpt_text = "\n\n---\n\n".join(article_paragraphs[i] for i in top_indices)
+        pooled = paragraph_vectors[top_indices].mean(axis=0)
+        pooled = (pooled / (np.linalg.norm(pooled) + 1e-12)).tolist()
+        results[index] = (excerpt_text, pooled)
+        excerpt_texts.append(excerpt_text)
+        pooled_vectors.append(pooled)
+
+    # The stored article text is the excerpt, so cache its pooled vector under that text
+    store_embeddings(excerpt_texts, pooled_vectors)
+    print(f"  - Extracted key excerpts for {len(analyzed)} articles by embedding similarity.")
+    return results
+
+
+def extract_key_excerpts(articles, num_excerpts=3, mode=None):
+    """
+    Extracts key excerpts for many (title, full_content) pairs with the
+    configured EXCERPT_MODE. Returns one string per article.
+    """
+    mode = mode or EXCERPT_MODE
+    if mode == 'embedding':
+        return [text for text, _ in extract_key_excerpts_by_embedding_batch(articles, num_excerpts)]
+    if mode == 'tfidf':
+        return extract_key_excerpts_batch(articles, num_excerpts)
+    raise ValueError(f"Unknown EXCERPT_MODE '{mode}'. Use 'tfidf' or 'embedding'.")
@@ -0,0 +1,185 @@
+# backend/benchmark.py
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+# Stages measured, in pipeline order (see pipeline.STAGES)
+BENCHMARK_STAGES = ['warm_up', 'setup_categories', 'discover', 'categorize', 'daily_pulses']
+DEFAULT_SIZES = [50, 200]
+DEFAULT_SITES = 4
+
+
+def configure_environment(state_dir, llm_latency):
+    """
+    Points every backend module at offline stand-ins: local SQLite storage
+    instead of Supabase, the fake LLM, and a throwaway state folder. Must
+    run before any backend module is imported, since they read their
+    configuration at import time.
+    """
+    os.environ['LOCAL_STATE_DIR'] = state_dir
+    os.environ['STORAGE_BACKEND'] = 'local'
+    os.environ['LLM_BACKEND'] = 'fake'
+    os.environ['LLM_CACHE_MODE'] = 'off'
+    os.environ['FAKE_LLM_LATENCY'] = str(llm_latency)
+    # The fake model has no quota; keep the dispatcher's buckets out of the measurement
+    os.environ.setdefault('GEMINI_RPM', '100000')
+    os.environ.setdefault('GEMINI_TPM', '1000000000')
+
+
+@contextmanager
+def timed_calls(owner, name, samples):
+    """Temporarily wraps owner.name so every call's duration is appended to `samples`."""
+    original = getattr(owner, name)
+    lock = threading.Lock()
+
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return original(*args, **kwargs)
+        finally:
+            with lock:
+                samples.append(time.perf_counter() - start)
+
+    setattr(owner, name, wrapper)
+    try:
+        yield samples
+    finally:
+        setattr(owner, name, original)
+
+
+def count_items(stage, result):
+    if stage == 'discover':
+        return len(result or [])
+    return result if isinstance(result, int) else 0
+
+
+def run_single(num_articles, num_sites, site_latency, streaming, seed):
+    """
+    Runs the pipeline stages once against a freshly generated corpus and
+    returns per-stage throughput and latency.
+
+    Per-item latencies are the duration of each article scrape (discover),
+    each categorization batch (categorize) and each LLM call (daily_pulses).
+    """
+    import numpy as np
+    import categorize_articles
+    import discover_urls
+    import stream_categorizer
+    from benchmark_corpus import FixtureServer, generate_corpus
+    from llm_dispatch import LLMDispatcher
+    from pipeline import STAGES
+
+    corpus = generate_corpus(num_articles, num_sites=num_sites, seed=seed)
+    per_site = max(len(articles) for articles in corpus)
+    samples = {stage: [] for stage in BENCHMARK_STAGES}
+    report = {'articles': num_articles, 'sites': num_sites, 'streaming': streaming, 'stages': {}}
+    results = {}
+
+    with FixtureServer(corpus, latency=site_latency) as server, \
+            timed_calls(discover_urls, 'scrape_entry', samples['discover']), \
+            timed_calls(categorize_articles, 'categorize_batch', samples['categorize']), \
+            timed_calls(stream_categorizer, 'categorize_batch', samples['categorize']), \
+            timed_calls(LLMDispatcher, 'generate', samples['daily_pulses']):
+
+        for stage in BENCHMARK_STAGES:
+            start = time.perf_counter()
+            if stage == 'discover':
+                discover_kwargs = dict(feeds=server.feed_urls, max_articles_per_feed=per_site, per_host_delay_range=(0, 0))
+                if streaming:
+                    with stream_categorizer.StreamingCategorizer() as categorizer:
+                        result = discover_urls.discover_and_scrape(on_article_stored=categorizer.put, **discover_kwargs)
+                else:
+                    result = discover_urls.discover_and_scrape(**discover_kwargs)
+            else:
+                result = STAGES[stage][0](results, {'streaming': streaming})
+            seconds = time.perf_counter() - start
+            results[stage] = result
+
+            items = count_items(stage, result)
+            stage_report = {
+                'items': items,
+                'seconds': round(seconds, 3),
+                'items_per_second': round(items / seconds, 2) if seconds and items else 0.0,
+                'calls': len(samples[stage]),
+            }
+            if samples[stage]:
+                p50, p95 = np.percentile(samples[stage], [50, 95])
+                stage_report['p50_ms'] = round(p50 * 1000, 1)
+                stage_report['p95_ms'] = round(p95 * 1000, 1)
+            report['stages'][stage] = stage_report
+    return report
+
+
+def print_report(reports):
+    print('\nBenchmark results:')
+    header = f"{'articles':>8}  {'stage':<17}{'items':>7}{'seconds':>10}{'items/s':>10}{'calls':>7}{'p50 ms':>10}{'p95 ms':>10}"
+    print(header)
+    print('-' * len(header))
+    for report in reports:
+        for stage, stats in report['stages'].items():
+            print(f"{report['articles']:>8}  {stage:<17}{stats['items']:>7}{stats['seconds']:>10.2f}"
+                  f"{stats['items_per_second']:>10.2f}{stats['calls']:>7}"
+                  f"{stats.get('p50_ms', float('nan')):>10.1f}{stats.get('p95_ms', float('nan')):>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Runs the pipeline offline against a synthetic corpus (local storage, fixture sites, '
+                    'fake LLM) and reports per-stage throughput and latency.'
+    )
+    parser.add_argument('--sizes', default=','.join(str(size) for size in DEFAULT_SIZES),
+                        help='Comma-separated corpus sizes (number of articles); each runs in a fresh process.')
+    parser.add_argument('--sites', type=int, default=DEFAULT_SITES, help='Number of synthetic sites (hosts).')
+    parser.add_argument('--site-latency', type=float, default=0.05, help='Seconds added to every fixture response.')
+    parser.add_argument('--llm-latency', type=float, default=0.5, help='Seconds per fake LLM call.')
+    parser.add_argument('--streaming', action='store_true', help='Categorize articles while they are being scraped.')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for the synthetic corpus.')
+    parser.add_argument('--output', help='Write the results as JSON to this file.')
+    parser.add_argument('--single-run', type=int, help=argparse.SUPPRESS)  # One size, in this process
+    args = parser.parse_args()
+
+    if args.single_run is not None:
+        with tempfile.TemporaryDirectory(prefix='pulse-benchmark-') as state_dir:
+            configure_environment(state_dir, args.llm_latency)
+            report = run_single(args.single_run, args.sites, args.site_latency, args.streaming, args.seed)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f)
+        return
+
+    # Backend modules keep their clients and state in module globals, so each
+    # corpus size runs in its own process with its own empty state folder.
+    reports = []
+    for size in [int(size) for size in args.sizes.split(',') if size.strip()]:
+        print(f'\n=== Benchmark: {size} articles over {args.sites} sites ===')
+        with tempfile.NamedTemporaryFile(suffix='.json', delete=False) as f:
+            result_path = f.name
+        command = [
+            sys.executable, os.path.abspath(__file__), '--single-run', str(size),
+            '--sites', str(args.sites), '--site-latency', str(args.site_latency),
+            '--llm-latency', str(args.llm_latency), '--seed', str(args.seed), '--output', result_path,
+        ] + (['--streaming'] if args.streaming else [])
+        try:
+            subprocess.run(command, check=True)
+            with open(result_path, encoding='utf-8') as f:
+                reports.append(json.load(f))
+        except subprocess.CalledProcessError as e:
+            print(f'Benchmark with {size} articles failed (exit code {e.returncode}).')
+        finally:
+            os.remove(result_path)
+
+    print_report(reports)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(reports, f, indent=2)
+        print(f'\nResults written to {args.output}')
+
+
+if __name__ == "__main__":
+    main()
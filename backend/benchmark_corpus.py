@@ -0,0 +1,255 @@
+# backend/benchmark_corpus.py
+
+import hashlib
+import os
+import random
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from string import Template
+from xml.sax.saxutils import escape
+
+# Recorded page and feed layouts, filled in with synthetic articles
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_fixtures')
+# Article layouts served in turn by the synthetic sites: a semantic
+# <article> page and a CMS-style page that only the .entry-content
+# fallback selector matches, so selector learning is exercised too.
+ARTICLE_LAYOUTS = ['article.html', 'entry_article.html']
+
+# Vocabulary per category (names match setup_categories.PREDEFINED_CATEGORIES),
+# so generated articles are spread over categories the way real ones are.
+TOPIC_VOCABULARY = {
+    'Ransomware': {
+        'actors': ['LockBit affiliates', 'the BlackCat gang', 'a Royal ransomware crew', 'Akira operators'],
+        'targets': ['a regional hospital network', 'a county school district', 'a logistics provider', 'a city government'],
+        'terms': ['encrypted file servers', 'a ransom demand', 'double extortion', 'a leak site post', 'offline backups', 'a decryptor'],
+    },
+    'Phishing & Social Engineering': {
+        'actors': ['a phishing-as-a-service kit', 'business email compromise scammers', 'a credential harvesting campaign'],
+        'targets': ['Microsoft 365 users', 'finance departments', 'payroll staff', 'help desk employees'],
+        'terms': ['lookalike login pages', 'QR code lures', 'spoofed invoices', 'MFA fatigue prompts', 'malicious attachments'],
+    },
+    'Software & Hardware Vulnerabilities (CVEs)': {
+        'actors': ['a security researcher', 'the vendor advisory', 'CISA'],
+        'targets': ['a popular VPN appliance', 'an open-source web server', 'enterprise firewalls', 'a widely used router'],
+        'terms': ['a critical CVE', 'remote code execution', 'a CVSS score of 9.8', 'an out-of-band patch', 'a proof-of-concept exploit'],
+    },
+    'Nation-State Threats (APTs)': {
+        'actors': ['a state-sponsored APT group', 'Volt Typhoon', 'an espionage cluster', 'APT29'],
+        'targets': ['defense contractors', 'telecom carriers', 'diplomatic entities', 'critical infrastructure operators'],
+        'terms': ['long-term persistence', 'living-off-the-land techniques', 'custom implants', 'espionage objectives'],
+    },
+    'Data Breaches & Leaks': {
+        'actors': ['an unknown intruder', 'a misconfigured database', 'a third-party contractor'],
+        'targets': ['a retail chain', 'an insurance company', 'a healthcare billing firm', 'a mobile app developer'],
+        'terms': ['exposed customer records', 'stolen personal data', 'breach notification letters', 'credit monitoring', 'a data leak'],
+    },
+    'Cloud Security Incidents': {
+        'actors': ['attackers abusing stolen keys', 'a cloud misconfiguration', 'a compromised CI pipeline'],
+        'targets': ['AWS S3 buckets', 'Azure tenants', 'Kubernetes clusters', 'SaaS workspaces'],
+        'terms': ['exposed access tokens', 'overly permissive IAM roles', 'cryptomining workloads', 'public storage buckets'],
+    },
+    'AI in Cybersecurity': {
+        'actors': ['security vendors', 'a red team', 'threat actors using large language models'],
+        'targets': ['AI coding assistants', 'LLM-powered chatbots', 'machine learning pipelines'],
+        'terms': ['prompt injection', 'model poisoning', 'AI-generated phishing', 'automated vulnerability discovery', 'guardrails'],
+    },
+    'Cyber Policy & Regulations': {
+        'actors': ['lawmakers', 'the SEC', 'European regulators', 'a federal agency'],
+        'targets': ['public companies', 'critical infrastructure owners', 'software vendors', 'data brokers'],
+        'terms': ['new disclosure rules', 'incident reporting deadlines', 'a proposed bill', 'compliance requirements', 'fines'],
+    },
+}
+FILLER_SENTENCES = [
+    'Researchers said the activity had been under way for several weeks before it was detected.',
+    'The company said it had notified law enforcement and engaged an incident response firm.',
+    'Security teams are advised to review logs for indicators of compromise published alongside the report.',
+    'It is not yet clear how many organizations were affected in total.',
+    'Analysts expect similar campaigns to continue as long as they remain profitable.',
+    'A spokesperson declined to comment on the investigation beyond the public statement.',
+]
+AUTHORS = ['Alex Rivera', 'Sam Chen', 'Jordan Patel', 'Taylor Morgan', 'Casey Nguyen']
+
+
+def _load_template(name):
+    with open(os.path.join(FIXTURES_DIR, name), encoding='utf-8') as f:
+        return Template(f.read())
+
+
+def _sentence(rng, vocabulary):
+    patterns = [
+        'In the latest incident, {actor} targeted {target}, relying on {term}.',
+        'According to the report, {target} were hit after {actor} used {term} to gain a foothold.',
+        'Investigators linked {term} to {actor}, warning that {target} remain at risk.',
+        'The campaign against {target} shows how {actor} continue to refine {term}.',
+    ]
+    return rng.choice(patterns).format(
+        actor=rng.choice(vocabulary['actors']),
+        target=rng.choice(vocabulary['targets']),
+        term=rng.choice(vocabulary['terms']),
+    )
+
+
+def generate_corpus(num_articles, num_sites=4, paragraphs=(4, 7), seed=0):
+    """
+    Generates a deterministic synthetic corpus spread over `num_sites` sites.
+
+    Each article gets a topic from TOPIC_VOCABULARY, a title and several
+    multi-sentence paragraphs built from that topic's vocabulary, and a
+    publication time within the last day. The same seed always yields the
+    same corpus, so benchmark runs are comparable.
+
+    Returns:
+        list: One list of article dicts per site.
+    """
+    rng = random.Random(seed)
+    topics = list(TOPIC_VOCABULARY)
+    now = datetime.now(timezone.utc)
+    sites = [[] for _ in range(num_sites)]
+    for i in range(num_articles):
+        topic = rng.choice(topics)
+        vocabulary = TOPIC_VOCABULARY[topic]
+        title = f"{rng.choice(vocabulary['actors']).capitalize()} target {rng.choice(vocabulary['targets'])} with {rng.choice(vocabulary['terms'])}"
+        article_paragraphs = []
+        for _ in range(rng.randint(*paragraphs)):
+            sentences = [_sentence(rng, vocabulary) for _ in range(rng.randint(2, 3))]
+            sentences.insert(rng.randint(0, len(sentences)), rng.choice(FILLER_SENTENCES))
+            article_paragraphs.append(' '.join(sentences))
+        sites[i % num_sites].append({
+            'slug': f'article-{i}',
+            'topic': topic,
+            'title': title,
+            'author': rng.choice(AUTHORS),
+            'published': now - timedelta(minutes=rng.randint(5, 23 * 60)),
+            'paragraphs': article_paragraphs,
+        })
+    return sites
+
+
+class FixtureSite:
+    """
+    One synthetic news site: an RSS feed at /feed.xml and one HTML page
+    per article at /articles/<slug>, rendered from the fixture templates.
+    """
+
+    def __init__(self, index, articles):
+        self.index = index
+        self.name = f'Synthetic Security News {index}'
+        self.articles = {article['slug']: article for article in articles}
+        self.layout = _load_template(ARTICLE_LAYOUTS[index % len(ARTICLE_LAYOUTS)])
+        self.base_url = None  # Set once the server is bound to a port
+
+    def render_feed(self):
+        item_template = _load_template('rss_item.xml')
+        newest_first = sorted(self.articles.values(), key=lambda a: a['published'], reverse=True)
+        items = ''.join(
+            item_template.substitute(
+                title=escape(article['title']),
+                link=f"{self.base_url}/articles/{article['slug']}",
+                pub_date=format_datetime(article['published']),
+                summary=escape(article['paragraphs'][0][:200]),
+            )
+            for article in newest_first
+        )
+        return _load_template('rss_feed.xml').substitute(
+            site_name=escape(self.name),
+            site_url=self.base_url,
+            build_date=format_datetime(newest_first[0]['published'] if newest_first else datetime.now(timezone.utc)),
+            items=items,
+        )
+
+    def render_article(self, slug):
+        article = self.articles.get(slug)
+        if article is None:
+            return None
+        return self.layout.substitute(
+            title=escape(article['title']),
+            site_name=escape(self.name),
+            author=article['author'],
+            pub_date=article['published'].strftime('%B %d, %Y'),
+            paragraphs='\n'.join(f'      <p>{escape(paragraph)}</p>' for paragraph in article['paragraphs']),
+        )
+
+
+def _make_handler(site, latency):
+    class FixtureHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if latency:
+                time.sleep(latency)
+            if self.path == '/feed.xml':
+                body, content_type = site.render_feed(), 'application/rss+xml; charset=utf-8'
+            elif self.path.startswith('/articles/'):
+                body, content_type = site.render_article(self.path[len('/articles/'):]), 'text/html; charset=utf-8'
+            else:
+                body = None
+            if body is None:
+                self.send_error(404)
+                return
+
+            payload = body.encode('utf-8')
+            etag = '"' + hashlib.sha1(payload).hexdigest() + '"'
+            if self.headers.get('If-None-Match') == etag:
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(payload)))
+            self.send_header('ETag', etag)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass  # Keep benchmark output readable
+
+    return FixtureHandler
+
+
+class FixtureServer:
+    """
+    Serves a synthetic corpus over HTTP on localhost, one port per site, so
+    the crawler sees separate hosts (and applies per-host politeness)
+    exactly as it would for real feeds.
+
+    `latency` adds a fixed delay in seconds to every response. Feeds
+    support conditional GETs via ETag. Use as a context manager.
+    """
+
+    def __init__(self, corpus, latency=0.0, host='127.0.0.1'):
+        self.sites = [FixtureSite(i, articles) for i, articles in enumerate(corpus)]
+        self.latency = latency
+        self.host = host
+        self._servers = []
+        self._threads = []
+
+    @property
+    def feed_urls(self):
+        return [f'{site.base_url}/feed.xml' for site in self.sites]
+
+    def start(self):
+        for site in self.sites:
+            server = ThreadingHTTPServer((self.host, 0), _make_handler(site, self.latency))
+            server.daemon_threads = True
+            site.base_url = f'http://{self.host}:{server.server_address[1]}'
+            thread = threading.Thread(target=server.serve_forever, name=f'fixture-site-{site.index}', daemon=True)
+            thread.start()
+            self._servers.append(server)
+            self._threads.append(thread)
+        return self
+
+    def stop(self):
+        for server in self._servers:
+            server.shutdown()
+            server.server_close()
+        for thread in self._threads:
+            thread.join()
+        self._servers, self._threads = [], []
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
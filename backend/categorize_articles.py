@@ -1,20 +1,111 @@
 # backend/categorize_articles.py
-import os
 import json
 import numpy as np
-from dotenv import load_dotenv
-from supabase import create_client, Client
-from embedding_utils import generate_embedding, get_or_create_collection, ARTICLES_COLLECTION
-
-load_dotenv()
-supabase_url = os.getenv("SUPABASE_URL")
-supabase_key = os.getenv("SUPABASE_SERVICE_KEY")
-if not supabase_url or not supabase_key:
-    raise ValueError("Supabase credentials must be set.")
-supabase: Client = create_client(supabase_url, supabase_key)
-
-def categorize_articles(similarity_threshold=0.4):
-    print('Starting article categorization...')
+from db_utils import chunked, execute_with_retries, iter_rows, DEFAULT_PAGE_SIZE
+from embedding_utils import generate_embeddings, get_chroma_client, get_embedding_cache, get_or_create_collection, startup_report, ARTICLES_COLLECTION
+from storage import get_client
+
+supabase = get_client()
+
+# Number of articles per SentenceTransformer.encode() batch.
+EMBEDDING_BATCH_SIZE = 64
+# Number of articles per bulk article_categories delete + insert / is_categorized update.
+WRITE_CHUNK_SIZE = 100
+# Article columns categorization needs; everything else stays in the database.
+ARTICLE_COLUMNS = 'id, url, title, raw_content'
+UNCATEGORIZED_FILTERS = [('eq', 'is_categorized', 'false')]
+
+
+def add_articles_to_collection(articles_collection, embedded_articles):
+    """Adds (article, embedding) pairs to ChromaDB with as few bulk `add` calls as the client allows."""
+    max_batch_size = get_chroma_client().get_max_batch_size()
+    for i in range(0, len(embedded_articles), max_batch_size):
+        chunk = embedded_articles[i:i + max_batch_size]
+        try:
+            articles_collection.add(
+                documents=[article['raw_content'] for article, _ in chunk],
+                metadatas=[{"url": article['url'], "title": article['title']} for article, _ in chunk],
+                ids=[str(article['id']) for article, _ in chunk],
+                embeddings=[embedding for _, embedding in chunk]
+            )
+        except Exception as e:
+            print(f'    Warning: Failed to add {len(chunk)} articles to ChromaDB: {e}')
+
+
+def write_categorization_results(categorized, chunk_size=WRITE_CHUNK_SIZE):
+    """
+    Writes article_categories links and marks articles as categorized with
+    chunked bulk calls: per chunk, a delete of the chunk's existing links,
+    one insert and one `update ... in_('id', [...])`. Articles whose writes
+    failed stay uncategorized and are picked up again on the next run.
+
+    Because links are cleared before they are inserted, a retried insert
+    that already went through, or a later run after a failed update,
+    replaces the links instead of duplicating them.
+    """
+    linked_articles = 0
+    failed_articles = 0
+    for chunk in chunked(categorized, chunk_size):
+        article_ids = [article_id for article_id, _ in chunk]
+        link_rows = [row for _, rows in chunk for row in rows]
+
+        def replace_links():
+            # Clear first, so a retry after an insert that did go through replaces instead of duplicating
+            supabase.table('article_categories').delete().in_('article_id', article_ids).execute()
+            if link_rows:
+                supabase.table('article_categories').insert(link_rows).execute()
+
+        if not execute_with_retries(replace_links, f'linking {len(article_ids)} articles to categories'):
+            failed_articles += len(article_ids)
+            continue
+
+        if not execute_with_retries(
+            lambda: supabase.table('articles').update({'is_categorized': True}).in_('id', article_ids).execute(),
+            f'marking {len(article_ids)} articles as categorized'
+        ):
+            failed_articles += len(article_ids)
+            continue
+
+        linked_articles += sum(1 for _, rows in chunk if rows)
+        print(f'  Wrote {len(link_rows)} category links for {len(article_ids)} articles.')
+
+    print(f'Linked {linked_articles} articles to categories.')
+    if failed_articles:
+        print(f'Warning: {failed_articles} articles could not be written and remain uncategorized.')
+
+
+def iter_uncategorized_articles(known_articles=None, page_size=DEFAULT_PAGE_SIZE):
+    """
+    Yields all uncategorized articles, a page at a time.
+
+    Rows already in memory (e.g. handed over by the discovery stage) are
+    reused: only the ids of uncategorized articles are queried, and full
+    rows are fetched just for the ones not in `known_articles`.
+    """
+    if known_articles is None:
+        yield from iter_rows(supabase, 'articles', ARTICLE_COLUMNS, UNCATEGORIZED_FILTERS, page_size=page_size)
+        return
+
+    uncategorized_ids = [row['id'] for row in iter_rows(supabase, 'articles', 'id', UNCATEGORIZED_FILTERS, page_size=page_size)]
+    known_by_id = {article['id']: article for article in known_articles}
+    missing_ids = [article_id for article_id in uncategorized_ids if article_id not in known_by_id]
+    if known_by_id:
+        print(f'Reusing {len(uncategorized_ids) - len(missing_ids)} articles from memory; fetching {len(missing_ids)} from the backlog.')
+    for article_id in uncategorized_ids:
+        if article_id in known_by_id:
+            yield known_by_id[article_id]
+    for chunk in chunked(missing_ids):
+        yield from supabase.table('articles').select(ARTICLE_COLUMNS).in_('id', chunk).execute().data
+
+
+def load_categories():
+    """
+    Fetches the categories that have an embedding.
+
+    Returns:
+        tuple: (category rows, matrix of their embeddings) with matrix rows
+               aligned to the category rows.
+    """
     try:
         response = supabase.table('categories').select('id, name, embedding').execute()
         category_objects = response.data
@@ -24,50 +115,94 @@ def categorize_articles(similarity_threshold=0.4):
     if not category_objects:
         raise Exception("No categories found. Please run setup_categories.py first.")
 
-    category_embeddings_np = np.array([json.loads(cat['embedding']) for cat in category_objects if cat['embedding']])
+    # Keep rows aligned with the embedding matrix so matrix columns map back to categories
+    category_objects = [cat for cat in category_objects if cat['embedding']]
+    category_embeddings_np = np.array([json.loads(cat['embedding']) for cat in category_objects])
+    return category_objects, category_embeddings_np
+
+
+def categorize_batch(articles, category_objects, category_embeddings_np, articles_collection, similarity_threshold=0.4, batch_size=EMBEDDING_BATCH_SIZE, write_chunk_size=WRITE_CHUNK_SIZE):
+    """
+    Embeds a batch of articles, stores the vectors in ChromaDB and links
+    each article to every category it is similar enough to.
+
+    Returns:
+        int: The number of articles processed.
+    """
+    # 1. Encode all articles in batched model passes
+    print(f'Generating embeddings for {len(articles)} articles (batch size {batch_size})...')
+    embeddings = generate_embeddings([article['raw_content'] for article in articles], batch_size=batch_size)
+
+    embedded_articles = []
+    for article, embedding in zip(articles, embeddings):
+        if embedding is None:
+            print(f'  Failed to generate embedding for "{article["title"]}" ({article["url"]}). Skipping.')
+            continue
+        embedded_articles.append((article, embedding))
+
+    if not embedded_articles:
+        print('No articles could be embedded.')
+        return 0
+
+    # 2. Write all vectors to ChromaDB in bulk
+    add_articles_to_collection(articles_collection, embedded_articles)
+
+    # 3. One articles x categories similarity matrix for the whole batch
+    article_embeddings_np = np.array([embedding for _, embedding in embedded_articles])
+    similarity_matrix = article_embeddings_np @ category_embeddings_np.T
+
+    categorized = []  # (article_id, [link rows])
+    for (article, _), similarities in zip(embedded_articles, similarity_matrix):
+        print(f'  Processing article: "{article["title"]}" ({article["url"]})')
+        rows = []
+        for i in np.flatnonzero(similarities >= similarity_threshold):
+            rows.append({'article_id': article['id'], 'category_id': category_objects[i]['id']})
+            print(f'    Matched with category: {category_objects[i]["name"]} (Similarity: {similarities[i]:.4f})')
+        categorized.append((article['id'], rows))
+
+    # 4. Bulk-write category links and flip is_categorized one chunk of
+    #    articles at a time, so a failure only retries (or skips) that chunk.
+    write_categorization_results(categorized, chunk_size=write_chunk_size)
+    return len(categorized)
+
+
+def categorize_articles(similarity_threshold=0.4, batch_size=EMBEDDING_BATCH_SIZE, write_chunk_size=WRITE_CHUNK_SIZE, articles=None, page_size=DEFAULT_PAGE_SIZE):
+    """
+    Embeds uncategorized articles and links them to every category they are
+    similar enough to, one page of at most `page_size` articles at a time.
+
+    Args:
+        articles (list): Optional article rows already in memory, e.g. the
+            ones the discovery stage just stored; see iter_uncategorized_articles.
+
+    Returns:
+        int: The number of articles processed.
+    """
+    print('Starting article categorization...')
+    category_objects, category_embeddings_np = load_categories()
     articles_collection = get_or_create_collection(ARTICLES_COLLECTION)
 
+    found_count = 0
+    categorized_count = 0
     try:
-        response = supabase.table('articles').select('*').eq('is_categorized', 'false').execute()
-        uncategorized_articles = response.data
+        for page in chunked(iter_uncategorized_articles(articles, page_size=page_size), page_size):
+            found_count += len(page)
+            categorized_count += categorize_batch(
+                page, category_objects, category_embeddings_np, articles_collection,
+                similarity_threshold=similarity_threshold, batch_size=batch_size, write_chunk_size=write_chunk_size
+            )
     except Exception as e:
-        raise Exception(f"Could not fetch uncategorized articles: {e}")
+        raise Exception(f"Could not categorize uncategorized articles: {e}")
 
-    if not uncategorized_articles:
+    if not found_count:
         print('No new uncategorized articles found.')
-        return
+        return 0
 
-    for article in uncategorized_articles:
-        print(f'  Processing article: "{article["title"]}" ({article["url"]})')
-        article_embedding = generate_embedding(article['raw_content'])
-        if not article_embedding:
-            print(f'    Failed to generate embedding for article. Skipping.')
-            continue
-        try:
-            articles_collection.add(
-                documents=[article['raw_content']],
-                metadatas=[{"url": article['url'], "title": article['title']}],
-                ids=[str(article['id'])],
-                embeddings=[article_embedding]
-            )
-        except Exception as e:
-            print(f'    Warning: Failed to add article to ChromaDB: {e}')
-
-        similarities = np.dot(category_embeddings_np, np.array(article_embedding))
-        matched_category_ids = []
-        for i, sim in enumerate(similarities):
-            if sim >= similarity_threshold:
-                matched_category_ids.append(category_objects[i]['id'])
-                print(f'    Matched with category: {category_objects[i]["name"]} (Similarity: {sim:.4f})')
-        try:
-            if matched_category_ids:
-                rows_to_insert = [{'article_id': article['id'], 'category_id': cat_id} for cat_id in matched_category_ids]
-                supabase.table('article_categories').insert(rows_to_insert).execute()
-                print(f'    Successfully linked article to {len(matched_category_ids)} categories.')
-            supabase.table('articles').update({'is_categorized': True}).eq('id', article['id']).execute()
-        except Exception as e:
-            print(f"    Error updating article status or links: {e}")
+    cache_stats = get_embedding_cache().stats()
+    print(f"Embedding cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses.")
     print('Finished article categorization.')
+    return categorized_count
 
 if __name__ == "__main__":
-    categorize_articles()
\ No newline at end of file
+    categorize_articles()
+    startup_report()
@@ -0,0 +1,71 @@
+# backend/db_utils.py
+
+import time
+from itertools import islice
+from http_client import backoff_delay
+
+# Rows (or ids) per bulk Supabase call. Keeps request bodies and `in_`
+# filter URLs comfortably below PostgREST limits.
+DEFAULT_CHUNK_SIZE = 200
+# Rows per page when streaming a table with iter_rows.
+DEFAULT_PAGE_SIZE = 500
+
+
+def chunked(items, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yields successive lists of at most `chunk_size` items. Works lazily on any iterable."""
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def iter_rows(client, table, columns='*', filters=(), page_size=DEFAULT_PAGE_SIZE, key='id'):
+    """
+    Yields the rows of a Supabase table page by page, so memory stays flat
+    however many rows match.
+
+    Pages are fetched by keyset (`key > last key seen`, ordered by `key`)
+    rather than by offset, so rows updated while iterating (e.g. flagged as
+    processed) neither shift later pages nor get skipped.
+
+    Args:
+        columns (str): PostgREST select list; must include `key`.
+        filters (iterable): (method, *args) tuples applied to every page's
+            query, e.g. [('eq', 'is_categorized', 'false')].
+    """
+    last_key = None
+    while True:
+        query = client.table(table).select(columns)
+        for method, *args in filters:
+            query = getattr(query, method)(*args)
+        if last_key is not None:
+            query = query.gt(key, last_key)
+        rows = query.order(key).limit(page_size).execute().data
+        yield from rows
+        if len(rows) < page_size:
+            return
+        last_key = rows[-1][key]
+
+
+def execute_with_retries(operation, description, max_retries=3, backoff_base=1, backoff_cap=30):
+    """
+    Runs a single Supabase call, retrying it with exponential backoff.
+
+    Args:
+        operation (callable): Zero-argument function performing the call.
+        description (str): Used in log messages.
+
+    Returns:
+        bool: True if the call eventually succeeded.
+    """
+    for attempt in range(max_retries):
+        try:
+            operation()
+            return True
+        except Exception as e:
+            print(f'    Error during {description} (attempt {attempt + 1}/{max_retries}): {e}')
+            if attempt + 1 < max_retries:
+                time.sleep(backoff_delay(attempt, backoff_base, backoff_cap))
+    return False
@@ -0,0 +1,115 @@
+# backend/dedup.py
+
+import re
+import zlib
+from collections import defaultdict
+from urllib.parse import urlparse
+import numpy as np
+
+# --- MinHash / LSH settings ---
+# 128 hash functions split into 32 bands of 4 rows. Two texts share a band
+# with probability 1 - (1 - J^4)^32: about 0.99 at a Jaccard similarity of
+# 0.6 and 1.0 at 0.7, falling to 0.56 at 0.4 and 0.23 at 0.3. Candidates
+# below NEAR_DUPLICATE_THRESHOLD are then dropped by the signature check.
+NUM_PERMUTATIONS = 128
+LSH_BANDS = 32
+# Candidate pairs are confirmed when their signatures agree on at least
+# this fraction of positions (an estimate of shingle Jaccard similarity).
+NEAR_DUPLICATE_THRESHOLD = 0.7
+SHINGLE_SIZE = 5
+# Different outlets rarely share wording, so stories are also merged when
+# their embeddings are this close.
+EMBEDDING_DUPLICATE_THRESHOLD = 0.9
+
+_MERSENNE_PRIME = np.uint64((1 << 31) - 1)
+_rng = np.random.RandomState(1)
+_PERM_A = _rng.randint(1, (1 << 31) - 1, size=NUM_PERMUTATIONS).astype(np.uint64)
+_PERM_B = _rng.randint(0, (1 << 31) - 1, size=NUM_PERMUTATIONS).astype(np.uint64)
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    """Returns the set of word n-grams of a text, after lower-casing and dropping punctuation."""
+    words = re.findall(r'\w+', (text or '').lower())
+    if len(words) < size:
+        return {' '.join(words)} if words else set()
+    return {' '.join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def minhash_signature(text):
+    """Computes a MinHash signature (NUM_PERMUTATIONS uint64 values) for a text, or None if it is empty."""
+    shingle_set = shingles(text)
+    if not shingle_set:
+        return None
+    hashes = np.fromiter((zlib.crc32(s.encode('utf-8')) for s in shingle_set), dtype=np.uint64, count=len(shingle_set))
+    # (a * x + b) mod p for every permutation and shingle; values stay below 2**63.
+    permuted = (np.outer(_PERM_A, hashes) + _PERM_B[:, None]) % _MERSENNE_PRIME
+    return permuted.min(axis=1)
+
+
+def cluster_near_duplicates(articles, signatures, threshold=NEAR_DUPLICATE_THRESHOLD, embeddings=None, embedding_threshold=EMBEDDING_DUPLICATE_THRESHOLD):
+    """
+    Groups near-identical articles using LSH banding over MinHash signatures
+    and, if `embeddings` ({article id: vector}) is given, cosine similarity.
+
+    Returns:
+        list: Clusters (lists of articles); singletons are included.
+    """
+    parent = list(range(len(articles)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    rows_per_band = NUM_PERMUTATIONS // LSH_BANDS
+    buckets = defaultdict(list)
+    for index, article in enumerate(articles):
+        signature = signatures.get(article['id'])
+        if signature is None:
+            continue
+        for band in range(LSH_BANDS):
+            band_values = signature[band * rows_per_band:(band + 1) * rows_per_band]
+            buckets[(band, band_values.tobytes())].append(index)
+
+    checked = set()
+    for members in buckets.values():
+        for i in range(len(members)):
+            for j in range(i + 1, len(members)):
+                a, b = members[i], members[j]
+                if (a, b) in checked or find(a) == find(b):
+                    continue
+                checked.add((a, b))
+                agreement = np.mean(signatures[articles[a]['id']] == signatures[articles[b]['id']])
+                if agreement >= threshold:
+                    parent[find(b)] = find(a)
+
+    embedded = [i for i, article in enumerate(articles) if embeddings and embeddings.get(article['id']) is not None]
+    if len(embedded) > 1:
+        matrix = np.array([embeddings[articles[i]['id']] for i in embedded], dtype=np.float32)
+        matrix /= np.linalg.norm(matrix, axis=1, keepdims=True) + 1e-12
+        similarity = matrix @ matrix.T
+        for a, b in zip(*np.nonzero(np.triu(similarity >= embedding_threshold, k=1))):
+            parent[find(embedded[b])] = find(embedded[a])
+
+    clusters = defaultdict(list)
+    for index, article in enumerate(articles):
+        clusters[find(index)].append(article)
+    return list(clusters.values())
+
+
+def collapse_duplicates(articles, signatures, threshold=NEAR_DUPLICATE_THRESHOLD, embeddings=None):
+    """
+    Keeps one representative per cluster of near-duplicate articles.
+
+    The representative is the copy with the most content. It is returned as
+    a shallow copy carrying 'sources' (the domains of every copy in the
+    cluster) and 'duplicate_ids' (the ids of the copies it stands in for).
+    """
+    representatives = []
+    for cluster in cluster_near_duplicates(articles, signatures, threshold, embeddings=embeddings):
+        representative = dict(max(cluster, key=lambda a: len(a.get('raw_content') or '')))
+        representative['sources'] = sorted({urlparse(a['url']).netloc for a in cluster if a.get('url')})
+        representative['duplicate_ids'] = [a['id'] for a in cluster if a['id'] != representative['id']]
+        representatives.append(representative)
+    return representatives
@@ -1,23 +1,21 @@
 # backend/discover_urls.py
 
 import feedparser
-import time
-import random
-import os
-from dotenv import load_dotenv
-from supabase import create_client, Client
-from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, as_completed, wait
 # Make sure your scraper and new analyzer are in the backend folder
-from scraper import scrape_article_content, initialize_chrome_driver
-from analyzer import extract_key_excerpts_by_similarity
+from driver_pool import ChromeDriverPool
+from http_client import get_session, print_connection_stats
+from analyzer import extract_key_excerpts, save_corpus_idf
+from db_utils import chunked
+from crawl_scheduler import DomainScheduler, get_domain, interleave_by_domain
+from seen_urls import SeenUrlIndex
+from feed_state import FeedStateStore, MAX_ENTRY_ATTEMPTS, select_new_entries, reoffer_entries
+from extraction_profiles import LearnedSelectorStore
+from tiered_fetcher import DomainTierStore, fetch_article
+from storage import get_client
 
 # --- Initialize Supabase Client ---
-load_dotenv()
-supabase_url = os.getenv("SUPABASE_URL")
-supabase_key = os.getenv("SUPABASE_SERVICE_KEY")
-if not supabase_url or not supabase_key:
-    raise ValueError("Supabase credentials must be set in the .env file.")
-supabase: Client = create_client(supabase_url, supabase_key)
+supabase = get_client()
 # --- End of Initialization ---
 
 CYBERSECURITY_RSS_FEEDS = [
@@ -43,14 +41,6 @@ CYBERSECURITY_RSS_FEEDS = [
     "https://cybersecuritynews.com/feed/",
 ]
 
-SELENIUM_REQUIRED_DOMAINS = [
-    'securityweek.com',
-    'darkreading.com',
-    'itsecurityguru.org',
-    'cdt.org',
-    'cisa.gov',
-]
-
 # --- NEW: Whitelist for domains where full content is permissible ---
 # Articles from these domains will not be summarized and the full
 # text will be stored in the database.
@@ -60,89 +50,290 @@ FULL_CONTENT_ALLOWED_DOMAINS = [
     # Add any other government or open-licensed domains here
 ]
 
-def discover_and_scrape(max_articles_per_feed=30):
+# --- Concurrency settings ---
+# Global cap on simultaneous feed/article fetches, and per-host cap so a
+# single site never sees more than a couple of requests at once.
+MAX_CONCURRENT_REQUESTS = 8
+MAX_REQUESTS_PER_HOST = 2
+# Randomized gap between two requests to the same host (seconds).
+PER_HOST_DELAY_RANGE = (1, 3)
+FEED_FETCH_TIMEOUT = 15
+# Scraped articles per vectorized excerpt-extraction batch
+ANALYSIS_BATCH_SIZE = 16
+# Selenium driver pool: number of concurrent headless Chromes, page loads
+# before a driver is recycled, and resource types blocked during page loads.
+SELENIUM_POOL_SIZE = 2
+SELENIUM_PAGES_PER_DRIVER = 25
+SELENIUM_BLOCKED_RESOURCES = ('images', 'media', 'fonts')
+# Number of URLs per Supabase `in_` lookup; keeps the request URL short.
+PROCESSED_URLS_LOOKUP_CHUNK_SIZE = 50
+
+
+def filter_new_urls(urls, seen_index, chunk_size=PROCESSED_URLS_LOOKUP_CHUNK_SIZE):
+    """
+    Returns the URLs that have not been processed yet.
+
+    URLs in the local seen-URL index are dropped without touching the network.
+    The remainder is checked against `processed_urls` with batched `in_`
+    lookups, and any hits are recorded locally for the next run.
+    """
+    unseen_urls = seen_index.filter_unseen(urls)
+    if not unseen_urls:
+        return []
+
+    already_processed = set()
+    for chunk in chunked(unseen_urls, chunk_size):
+        response = supabase.table('processed_urls').select('url').in_('url', chunk).execute()
+        already_processed.update(row['url'] for row in response.data)
+
+    if already_processed:
+        seen_index.add_many(already_processed)
+    return [url for url in unseen_urls if url not in already_processed]
+
+
+def fetch_feed(feed_url, scheduler, feed_store):
+    """
+    Polls a single RSS feed with a conditional GET, respecting per-host politeness.
+
+    Returns:
+        tuple: (new_entries, updated_state). A 304 Not Modified response skips
+               parsing and yields no entries and no state update.
+    """
+    state = feed_store.get(feed_url)
+    headers = {}
+    if state['etag']:
+        headers['If-None-Match'] = state['etag']
+    if state['modified']:
+        headers['If-Modified-Since'] = state['modified']
+
+    with scheduler.slot(feed_url):
+        response = get_session().get(feed_url, headers=headers, timeout=FEED_FETCH_TIMEOUT)
+
+    if response.status_code == 304:
+        return [], None
+    response.raise_for_status()
+
+    feed = feedparser.parse(response.content, response_headers=response.headers)
+    new_entries, updated_state = select_new_entries(feed, state)
+    updated_state['etag'] = response.headers.get('ETag')
+    updated_state['modified'] = response.headers.get('Last-Modified')
+    return new_entries, updated_state
+
+
+def scrape_entry(entry, scheduler, tier_store, driver_pool=None, learned_store=None):
+    """
+    Scrapes one feed entry, over plain HTTP or in headless Chrome as the
+    domain's fetch tier decides.
+
+    Returns a dict with 'url', 'title', 'domain' and 'content', or None if
+    the article could not be scraped.
+    """
+    link = entry.link
+    domain = get_domain(link)
+
+    print(f'  Attempting to scrape new article: {link}')
+    with scheduler.slot(link):
+        content = fetch_article(link, tier_store, driver_pool=driver_pool, learned_store=learned_store)
+
+    if not content:
+        print(f'  ❌ Failed to scrape content from {link}.')
+        return None
+
+    article_title = entry.title if hasattr(entry, 'title') else 'No Title Available'
+    return {'url': link, 'title': article_title, 'domain': domain, 'content': content}
+
+
+def analyze_scraped_batch(scraped_articles):
+    """
+    Turns scraped articles into rows to store: excerpts for most domains,
+    full content for whitelisted ones. Excerpts for the whole batch are
+    extracted in one vectorized pass (TF-IDF or embedding, per EXCERPT_MODE).
+    """
+    to_analyze = [a for a in scraped_articles if a['domain'] not in FULL_CONTENT_ALLOWED_DOMAINS]
+    excerpts = extract_key_excerpts([(a['title'], a['content']) for a in to_analyze])
+    excerpts_by_url = {a['url']: text for a, text in zip(to_analyze, excerpts)}
+
+    rows = []
+    for article in scraped_articles:
+        if article['domain'] in FULL_CONTENT_ALLOWED_DOMAINS:
+            print(f"  - Domain '{article['domain']}' is on the whitelist. Storing full content.")
+            content_to_store = article['content']
+        else:
+            content_to_store = excerpts_by_url.get(article['url'])
+
+        if not content_to_store:
+            print(f"  ❌ Failed to process content from {article['url']}. Skipping.")
+            continue
+        rows.append({'url': article['url'], 'title': article['title'], 'raw_content': content_to_store})
+    return rows
+
+
+def discover_and_scrape(max_articles_per_feed=30, max_workers=MAX_CONCURRENT_REQUESTS, max_per_host=MAX_REQUESTS_PER_HOST, analysis_batch_size=ANALYSIS_BATCH_SIZE, on_article_stored=None, feeds=CYBERSECURITY_RSS_FEEDS, per_host_delay_range=PER_HOST_DELAY_RANGE):
     """
     Discovers URLs, scrapes them, and either analyzes for excerpts or stores
     the full content based on a domain whitelist.
+
+    All feeds are fetched in parallel, then new articles are scraped in
+    parallel across domains. Politeness is enforced per host by a
+    DomainScheduler rather than a global sleep after every article.
+
+    Args:
+        on_article_stored (callable): Optional; called with each stored
+            article row as soon as it is inserted, e.g. to categorize
+            articles while scraping continues (see stream_categorizer.py).
+        feeds (list): RSS feed URLs to discover articles from.
+        per_host_delay_range (tuple): Randomized gap in seconds between two
+            requests to the same host; benchmarks against local fixtures
+            set it to (0, 0).
+
+    Returns:
+        list: The stored article rows as returned by Supabase (with ids),
+              so a following stage can use them without re-querying.
     """
     print('Starting URL discovery, scraping, and analysis...')
     total_new_articles = 0
+    stored_articles = []
+    scheduler = DomainScheduler(max_per_host=max_per_host, delay_range=per_host_delay_range)
+    seen_index = SeenUrlIndex()
+    feed_store = FeedStateStore()
+    learned_store = LearnedSelectorStore()
+    tier_store = DomainTierStore()
+    pending_feed_states = {}
+    feed_entries = {}  # feed URL -> its new entries, to settle its state at the end
+    finished_urls = set()  # Stored this run, or already processed before
 
-    chrome_driver = None
+    driver_pool = None
     try:
-        if any(any(d in feed for d in SELENIUM_REQUIRED_DOMAINS) for feed in CYBERSECURITY_RSS_FEEDS):
-            print("Initializing Chrome WebDriver for potential Selenium usage...")
-            chrome_driver = initialize_chrome_driver()
-
-        for feed_url in CYBERSECURITY_RSS_FEEDS:
-            print(f'\nProcessing feed: {feed_url}')
-            feed = feedparser.parse(feed_url)
-            
-            if not feed.entries:
-                print(f'  No entries found in feed: {feed_url}')
-                continue
-
-            for entry in feed.entries[:max_articles_per_feed]:
-                link = entry.link
-                
-                response = supabase.table('processed_urls').select('url').eq('url', link).execute()
-                if response.data:
-                    print(f'  URL already processed (skipping): {link}')
+        # Any domain can be escalated to Selenium, but drivers are only
+        # started lazily, on the first page that actually needs one.
+        print(f"Preparing a pool of up to {SELENIUM_POOL_SIZE} Chrome WebDrivers for potential Selenium usage...")
+        driver_pool = ChromeDriverPool(
+            size=SELENIUM_POOL_SIZE,
+            max_pages_per_driver=SELENIUM_PAGES_PER_DRIVER,
+            block_resources=SELENIUM_BLOCKED_RESOURCES
+        )
+
+        # Analysis gets its own worker so batches don't queue behind pending scrapes
+        with ThreadPoolExecutor(max_workers=max_workers) as executor, ThreadPoolExecutor(max_workers=1) as analysis_executor:
+            # 1. Fetch all feeds in parallel
+            feed_futures = {executor.submit(fetch_feed, feed_url, scheduler, feed_store): feed_url for feed_url in feeds}
+            candidate_entries = []
+            for future in as_completed(feed_futures):
+                feed_url = feed_futures[future]
+                try:
+                    new_feed_entries, updated_state = future.result()
+                except Exception as e:
+                    print(f'  Error fetching feed {feed_url}: {e}')
                     continue
 
-                print(f'  Attempting to scrape new article: {link}')
-                
-                domain = urlparse(link).netloc.lower()
-                force_selenium = any(d in domain for d in SELENIUM_REQUIRED_DOMAINS)
-
-                content = scrape_article_content(
-                    link, 
-                    chrome_driver=chrome_driver, 
-                    force_selenium_for_this_url=force_selenium
-                )
-
-                if content:
-                    article_title = entry.title if hasattr(entry, 'title') else 'No Title Available'
-                    content_to_store = None # --- MODIFIED: Initialize variable
-
-                    # --- MODIFIED: Conditional logic based on domain whitelist ---
-                    if domain in FULL_CONTENT_ALLOWED_DOMAINS:
-                        print(f"  - Domain '{domain}' is on the whitelist. Storing full content.")
-                        content_to_store = content
-                    else:
-                        print(f"  - Analyzing content for: \"{article_title[:60]}...\"")
-                        content_to_store = extract_key_excerpts_by_similarity(content, article_title)
-                    # --- End of modification ---
-                    
-                    if not content_to_store:
-                        print(f'  ❌ Failed to process content from {link}. Skipping.')
+                if updated_state is None:
+                    print(f'  Feed not modified since last run: {feed_url}')
+                    continue
+                pending_feed_states[feed_url] = updated_state
+
+                if not new_feed_entries:
+                    print(f'  No new entries in feed: {feed_url}')
+                    continue
+                print(f'Fetched feed: {feed_url} ({len(new_feed_entries)} new entries)')
+                feed_entries[feed_url] = new_feed_entries
+
+                candidate_entries.extend(new_feed_entries[:max_articles_per_feed])
+
+            # Drop already-processed URLs with one batched lookup per run
+            new_urls = set(filter_new_urls([entry.link for entry in candidate_entries], seen_index))
+            finished_urls.update(entry.link for entry in candidate_entries if entry.link not in new_urls)
+            new_entries = []
+            for entry in candidate_entries:
+                if entry.link in new_urls:
+                    new_entries.append(entry)
+                    new_urls.discard(entry.link)  # Same article listed in two feeds
+            print(f'\n{len(candidate_entries) - len(new_entries)} URLs already processed (skipped).')
+            candidate_entries = new_entries
+
+            # 2. Scrape new articles in parallel, spread across domains
+            print(f'\nScraping {len(candidate_entries)} new articles with up to {max_workers} workers...')
+            scrape_futures = [
+                executor.submit(scrape_entry, entry, scheduler, tier_store, driver_pool, learned_store)
+                for entry in interleave_by_domain(candidate_entries, key=lambda e: e.link)
+            ]
+
+            # 3. Hand scraped articles to the analysis worker for batched
+            #    excerpt extraction and 4. store analyzed rows from the main thread as
+            #    they complete, so storage overlaps the remaining scraping.
+            pending_scrapes = set(scrape_futures)
+            pending_analyses = set()
+            pending = []
+            while pending_scrapes or pending_analyses:
+                finished, _ = wait(pending_scrapes | pending_analyses, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    if future in pending_scrapes:
+                        pending_scrapes.discard(future)
+                        try:
+                            scraped = future.result()
+                        except Exception as e:
+                            print(f'  Unexpected error while scraping: {e}')
+                            continue
+                        if scraped:
+                            pending.append(scraped)
                         continue
-                    
+
+                    pending_analyses.discard(future)
                     try:
-                        # --- MODIFIED: Use the 'content_to_store' variable ---
-                        supabase.table('articles').insert({
-                            'url': link,
-                            'title': article_title,
-                            'raw_content': content_to_store # This will hold either excerpts or full text
-                        }).execute()
-                        
-                        supabase.table('processed_urls').insert({'url': link}).execute()
-                        
-                        total_new_articles += 1
-                        print(f'  ✅ Successfully stored content for: "{article_title[:60]}..."')
-                    except Exception as db_e:
-                        print(f'  Database error storing {link}: {db_e}')
-                else:
-                    print(f'  ❌ Failed to scrape content from {link}.')
-                
-                time.sleep(random.uniform(1, 3))
+                        rows = future.result()
+                    except Exception as e:
+                        print(f'  Unexpected error while analyzing articles: {e}')
+                        continue
+
+                    for article in rows:
+                        try:
+                            response = supabase.table('articles').insert(article).execute()
+                            supabase.table('processed_urls').insert({'url': article['url']}).execute()
+                            seen_index.add(article['url'])
+                            finished_urls.add(article['url'])
+                            stored_articles.extend(response.data or [])
+                            if on_article_stored:
+                                for row in response.data or []:
+                                    on_article_stored(row)
+
+                            total_new_articles += 1
+                            print(f'  ✅ Successfully stored content for: "{article["title"][:60]}..."')
+                        except Exception as db_e:
+                            print(f'  Database error storing {article["url"]}: {db_e}')
+
+                # Full batches go to analysis right away; the last partial one once scraping is done
+                if pending and (len(pending) >= analysis_batch_size or not pending_scrapes):
+                    pending_analyses.add(analysis_executor.submit(analyze_scraped_batch, pending))
+                    pending = []
+
+        # Only advance the feed high-water marks once the run got this far,
+        # so a crash mid-run re-offers the same entries next time. Entries
+        # cut off by max_articles_per_feed are offered again next run; ones
+        # that failed are retried on a few runs before being given up on.
+        for feed_url, state in pending_feed_states.items():
+            entries = feed_entries.get(feed_url, [])
+            skipped = entries[max_articles_per_feed:]
+            failed = [entry for entry in entries[:max_articles_per_feed] if entry.link not in finished_urls]
+            state, abandoned = reoffer_entries(state, skipped, failed)
+            if skipped or len(failed) > len(abandoned):
+                print(f'  {len(skipped) + len(failed) - len(abandoned)} entries of {feed_url} were not stored; offering them again next run.')
+            if abandoned:
+                print(f'  Giving up on {len(abandoned)} entries of {feed_url} after {MAX_ENTRY_ATTEMPTS} failed runs.')
+            feed_store.save(feed_url, state)
 
     finally:
-        if chrome_driver:
-            print("Quitting Chrome WebDriver...")
-            chrome_driver.quit()
+        save_corpus_idf()
+        seen_index.close()
+        feed_store.close()
+        print(f"Domains per fetch tier: {tier_store.summary()}")
+        learned_store.close()
+        tier_store.close()
+        if driver_pool:
+            print("Quitting Chrome WebDrivers...")
+            driver_pool.close()
 
+    print_connection_stats()
     print(f'\n🎉 Finished URL discovery. New articles stored: {total_new_articles}')
+    return stored_articles
 
 if __name__ == "__main__":
     discover_and_scrape()
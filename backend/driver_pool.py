@@ -0,0 +1,123 @@
+# backend/driver_pool.py
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from scraper import initialize_chrome_driver, DEFAULT_BLOCKED_RESOURCES
+
+# Seconds checkout() waits for a busy pool before giving up
+DRIVER_CHECKOUT_TIMEOUT = 120
+
+
+class ChromeDriverPool:
+    """
+    A bounded pool of reusable headless Chrome drivers.
+
+    Drivers are created lazily (up to `size`), handed out one per worker via
+    checkout()/checkin(), and recycled after `max_pages_per_driver` page loads
+    so long runs do not accumulate browser memory.
+    """
+
+    def __init__(self, size=2, max_pages_per_driver=25, block_resources=DEFAULT_BLOCKED_RESOURCES):
+        self.size = size
+        self.max_pages_per_driver = max_pages_per_driver
+        self.block_resources = tuple(block_resources)
+        self._available = deque()
+        # Guards the idle drivers and the created count; notified whenever a
+        # driver is returned or a slot is freed by recycling one.
+        self._condition = threading.Condition()
+        self._created = 0
+        self._page_counts = {}
+        self._closed = False
+        self._startup_failed = False
+
+    def _create_driver(self):
+        driver = initialize_chrome_driver(block_resources=self.block_resources)
+        if driver is not None:
+            with self._condition:
+                self._page_counts[id(driver)] = 0
+        return driver
+
+    def _quit_driver(self, driver):
+        with self._condition:
+            self._page_counts.pop(id(driver), None)
+        try:
+            driver.quit()
+        except Exception as e:
+            print(f"Error quitting Chrome WebDriver: {e}")
+
+    def checkout(self, timeout=DRIVER_CHECKOUT_TIMEOUT):
+        """
+        Returns an idle driver, starting a new one if the pool is not full yet.
+        Otherwise waits up to `timeout` seconds for a driver to be returned or
+        recycled, and raises TimeoutError if none becomes available. Returns
+        None if Chrome could not be started.
+        """
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while True:
+                if self._available:
+                    return self._available.popleft()
+                if self._startup_failed:
+                    # Don't retry a Chrome launch that already failed on every checkout.
+                    return None
+                if self._created < self.size:
+                    self._created += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"No Chrome WebDriver became available within {timeout}s "
+                                       f"({self._created} of {self.size} in use).")
+                self._condition.wait(remaining)
+
+        driver = self._create_driver()
+        if driver is None:
+            with self._condition:
+                self._created -= 1
+                self._startup_failed = True
+                self._condition.notify_all()
+        return driver
+
+    def checkin(self, driver, discard=False):
+        """Returns a driver to the pool, recycling it if it is worn out or broken."""
+        if driver is None:
+            return
+        with self._condition:
+            self._page_counts[id(driver)] = self._page_counts.get(id(driver), 0) + 1
+            worn_out = self._page_counts[id(driver)] >= self.max_pages_per_driver
+            if not (discard or worn_out or self._closed):
+                self._available.append(driver)
+                self._condition.notify()
+                return
+
+        self._quit_driver(driver)
+        with self._condition:
+            # Frees a slot, so a waiting checkout() can start a replacement
+            self._created -= 1
+            self._condition.notify()
+
+    @contextmanager
+    def driver(self, timeout=DRIVER_CHECKOUT_TIMEOUT):
+        """Context manager around checkout()/checkin()."""
+        driver = self.checkout(timeout=timeout)
+        discard = False
+        try:
+            yield driver
+        except Exception:
+            discard = True
+            raise
+        finally:
+            self.checkin(driver, discard=discard)
+
+    def close(self):
+        """Quits all idle drivers. Drivers still checked out are quit when returned."""
+        with self._condition:
+            self._closed = True
+            idle = list(self._available)
+            self._available.clear()
+        for driver in idle:
+            self._quit_driver(driver)
+        with self._condition:
+            self._created -= len(idle)
+            self._condition.notify_all()
@@ -0,0 +1,146 @@
+# backend/embedding_cache.py
+
+import hashlib
+import os
+import threading
+import time
+import numpy as np
+from local_state import LOCAL_STATE_DIR, open_connection
+
+# Kept in its own file: vectors make this much larger than the other local state.
+EMBEDDING_CACHE_PATH = os.path.join(LOCAL_STATE_DIR, 'embedding_cache.sqlite3')
+# ~1.5 KB per 384-dim vector, so the default bound is roughly 150 MB on disk.
+DEFAULT_MAX_ENTRIES = 100_000
+
+
+def content_hash(text):
+    """Returns the SHA-256 hex digest of a text."""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Disk-backed embedding cache keyed by model name and content hash.
+
+    Vectors are stored as float32 blobs. When the cache grows past
+    `max_entries`, the least recently used entries are evicted.
+    """
+
+    def __init__(self, path=EMBEDDING_CACHE_PATH, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = open_connection(path)
+        with self._conn:
+            self._conn.execute(
+                '''CREATE TABLE IF NOT EXISTS embeddings (
+                       model TEXT NOT NULL,
+                       hash TEXT NOT NULL,
+                       vector BLOB NOT NULL,
+                       last_access REAL NOT NULL,
+                       PRIMARY KEY (model, hash)
+                   )'''
+            )
+            self._conn.execute('CREATE INDEX IF NOT EXISTS embeddings_last_access ON embeddings (last_access)')
+            # Results of comparing alternative inference backends against the reference model
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS drift_checks (model TEXT PRIMARY KEY, min_cosine REAL NOT NULL, checked_at REAL NOT NULL)'
+            )
+
+    def get_many(self, model_name, texts):
+        """
+        Looks up many texts at once.
+
+        Returns:
+            list: Vectors (as lists of floats) aligned with `texts`, None for misses.
+        """
+        hashes = [content_hash(text) for text in texts]
+        found = {}
+        with self._lock:
+            unique_hashes = list(dict.fromkeys(hashes))
+            for i in range(0, len(unique_hashes), 500):
+                chunk = unique_hashes[i:i + 500]
+                placeholders = ','.join('?' * len(chunk))
+                rows = self._conn.execute(
+                    f'SELECT hash, vector FROM embeddings WHERE model = ? AND hash IN ({placeholders})',
+                    [model_name] + chunk
+                )
+                for digest, blob in rows:
+                    found[digest] = np.frombuffer(blob, dtype=np.float32).tolist()
+
+            if found:
+                now = time.time()
+                with self._conn:
+                    self._conn.executemany(
+                        'UPDATE embeddings SET last_access = ? WHERE model = ? AND hash = ?',
+                        [(now, model_name, digest) for digest in found]
+                    )
+
+            results = [found.get(digest) for digest in hashes]
+            hit_count = sum(1 for vector in results if vector is not None)
+            self.hits += hit_count
+            self.misses += len(results) - hit_count
+        return results
+
+    def get(self, model_name, text):
+        return self.get_many(model_name, [text])[0]
+
+    def put_many(self, model_name, texts, vectors):
+        """Stores vectors for texts, evicting least recently used entries if over capacity."""
+        now = time.time()
+        rows = [
+            (model_name, content_hash(text), np.asarray(vector, dtype=np.float32).tobytes(), now)
+            for text, vector in zip(texts, vectors)
+            if vector is not None
+        ]
+        if not rows:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO embeddings (model, hash, vector, last_access) VALUES (?, ?, ?, ?)',
+                rows
+            )
+            self._evict()
+
+    def put(self, model_name, text, vector):
+        self.put_many(model_name, [text], [vector])
+
+    def _evict(self):
+        count = self._conn.execute('SELECT COUNT(*) FROM embeddings').fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                'DELETE FROM embeddings WHERE rowid IN '
+                '(SELECT rowid FROM embeddings ORDER BY last_access ASC LIMIT ?)',
+                (excess,)
+            )
+
+    def get_drift_check(self, model_name):
+        """Returns the recorded minimum cosine similarity for a backend, or None if never checked."""
+        with self._lock:
+            row = self._conn.execute('SELECT min_cosine FROM drift_checks WHERE model = ?', (model_name,)).fetchone()
+        return row[0] if row else None
+
+    def record_drift_check(self, model_name, min_cosine):
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO drift_checks (model, min_cosine, checked_at) VALUES (?, ?, ?)',
+                (model_name, min_cosine, time.time())
+            )
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM embeddings').fetchone()[0]
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -1,43 +1,271 @@
 # backend/embedding_utils.py
 
-import chromadb
-from sentence_transformers import SentenceTransformer
 import os
+import threading
+import time
+from embedding_cache import EmbeddingCache
+from local_state import LOCAL_STATE_DIR
 
 # --- This is the key change ---
-# Get the absolute path of the directory where this script is located (the 'backend' folder)
-backend_dir = os.path.dirname(os.path.abspath(__file__))
-
 # Define the path for the ChromaDB data folder *inside* the 'backend' folder
-CHROMA_DB_PATH = os.path.join(backend_dir, 'chroma_db_data')
+# (or inside LOCAL_STATE_DIR when that points elsewhere)
+CHROMA_DB_PATH = os.path.join(LOCAL_STATE_DIR, 'chroma_db_data')
 # --- End of change ---
 
-# Initialize ChromaDB client (persistent)
-print(f"Initializing ChromaDB at: {CHROMA_DB_PATH}")
-chroma_client = chromadb.PersistentClient(path=CHROMA_DB_PATH)
+EMBEDDING_MODEL_NAME = 'all-MiniLM-L6-v2'
+EMBEDDING_DIMENSION = 384
 
-# Load a pre-trained Sentence Transformer model
-model = SentenceTransformer('all-MiniLM-L6-v2')
+# --- Inference backend ---
+# 'torch'      full-precision PyTorch (the reference)
+# 'torch-int8' PyTorch with int8 dynamic quantization of the Linear layers
+# 'onnx'       ONNX Runtime on CPU; EMBEDDING_ONNX_FILE picks the exported
+#              file, e.g. 'onnx/model_qint8_avx512_vnni.onnx' for a
+#              pre-quantized variant
+EMBEDDING_BACKEND = os.getenv('EMBEDDING_BACKEND', 'torch')
+EMBEDDING_ONNX_FILE = os.getenv('EMBEDDING_ONNX_FILE', 'onnx/model.onnx')
+# Intra-op CPU threads for inference; 0 keeps the library default
+EMBEDDING_THREADS = int(os.getenv('EMBEDDING_THREADS', '0'))
+# A non-reference backend is only used if every sample vector has at least
+# this cosine similarity to the reference model's vector.
+MIN_BACKEND_COSINE = 0.98
+DRIFT_CHECK_TEXTS = [
+    "Ransomware gang leaks data stolen from hospital network",
+    "Critical remote code execution vulnerability patched in VPN appliance",
+    "Phishing campaign impersonates Microsoft 365 login pages",
+    "Nation-state hackers target telecom providers in espionage campaign",
+    "New EU regulation sets cybersecurity requirements for connected devices",
+    "Zero-day exploit chain used against mobile browsers",
+]
 
-def get_embedding_model():
-    """Returns the SentenceTransformer model."""
+# --- Lazy singletons ---
+# The ChromaDB client, the SentenceTransformer model and the embedding cache
+# are created on first use, not at import time, so scripts that never embed
+# anything start instantly. Each has its own lock so that concurrent first
+# callers initialize it exactly once.
+_chroma_client = None
+_model = None
+_embedding_cache = None
+_active_backend = None  # Backend actually in use once the model is loaded
+_chroma_lock = threading.Lock()
+_model_lock = threading.Lock()
+_cache_lock = threading.Lock()
+
+# Seconds spent initializing each component, for startup_report()
+startup_timings = {}
+
+
+def _timed_init(name, factory):
+    start = time.perf_counter()
+    instance = factory()
+    startup_timings[name] = time.perf_counter() - start
+    print(f"Initialized {name} in {startup_timings[name]:.2f}s")
+    return instance
+
+def _create_chroma_client():
+    import chromadb  # Deferred: importing chromadb alone takes a noticeable moment
+
+    print(f"Initializing ChromaDB at: {CHROMA_DB_PATH}")
+    return chromadb.PersistentClient(path=CHROMA_DB_PATH)
+
+def _load_model(backend):
+    if backend not in ('torch', 'torch-int8', 'onnx'):
+        raise ValueError(f"Unknown EMBEDDING_BACKEND '{backend}'. Use 'torch', 'torch-int8' or 'onnx'.")
+    from sentence_transformers import SentenceTransformer  # Deferred: pulls in torch
+
+    if backend == 'onnx':
+        import onnxruntime
+
+        session_options = onnxruntime.SessionOptions()
+        if EMBEDDING_THREADS:
+            session_options.intra_op_num_threads = EMBEDDING_THREADS
+        return SentenceTransformer(
+            EMBEDDING_MODEL_NAME,
+            backend='onnx',
+            model_kwargs={
+                'file_name': EMBEDDING_ONNX_FILE,
+                'provider': 'CPUExecutionProvider',
+                'session_options': session_options,
+            },
+        )
+
+    import torch
+
+    if EMBEDDING_THREADS:
+        torch.set_num_threads(EMBEDDING_THREADS)
+    # Load a pre-trained Sentence Transformer model
+    model = SentenceTransformer(EMBEDDING_MODEL_NAME, device='cpu' if backend == 'torch-int8' else None)
+    if backend == 'torch-int8':
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return model
+
+def embedding_model_key(backend=None):
+    """
+    Identifies the vectors a backend produces, for cache keys. The reference
+    backend keeps the plain model name so existing cache entries stay valid.
+    """
+    backend = backend or _active_backend or EMBEDDING_BACKEND
+    if backend == 'torch':
+        return EMBEDDING_MODEL_NAME
+    if backend == 'onnx':
+        return f"{EMBEDDING_MODEL_NAME}:onnx:{EMBEDDING_ONNX_FILE}"
+    return f"{EMBEDDING_MODEL_NAME}:{backend}"
+
+def check_backend_drift(candidate_model, reference_model=None, texts=DRIFT_CHECK_TEXTS):
+    """
+    Compares a candidate backend's vectors with the reference PyTorch model.
+
+    Returns:
+        float: The lowest cosine similarity over the sample texts.
+    """
+    import numpy as np
+
+    reference_model = reference_model or _load_model('torch')
+    candidate = np.asarray(candidate_model.encode(texts), dtype=np.float32)
+    reference = np.asarray(reference_model.encode(texts), dtype=np.float32)
+    if candidate.shape != reference.shape or candidate.shape[1] != EMBEDDING_DIMENSION:
+        raise ValueError(f"Backend produced vectors of shape {candidate.shape}, expected {reference.shape}.")
+
+    cosines = np.sum(candidate * reference, axis=1) / (
+        np.linalg.norm(candidate, axis=1) * np.linalg.norm(reference, axis=1)
+    )
+    return float(cosines.min())
+
+def onnx_backend_available():
+    """SentenceTransformer's ONNX backend needs both onnxruntime and optimum[onnxruntime]."""
+    try:
+        import onnxruntime  # noqa: F401
+        from optimum.onnxruntime import ORTModelForFeatureExtraction  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+def _create_model():
+    global _active_backend
+    if EMBEDDING_BACKEND == 'torch':
+        _active_backend = 'torch'
+        return _load_model('torch')
+    if EMBEDDING_BACKEND == 'onnx' and not onnx_backend_available():
+        print("Warning: EMBEDDING_BACKEND=onnx needs 'optimum[onnxruntime]' (pip install optimum[onnxruntime]). "
+              "Falling back to 'torch'.")
+        _active_backend = 'torch'
+        return _load_model('torch')
+
+    model = _load_model(EMBEDDING_BACKEND)
+    # Verify each backend configuration against the reference once and
+    # remember the result, so later runs keep the faster startup.
+    cache = get_embedding_cache()
+    backend_key = embedding_model_key(EMBEDDING_BACKEND)
+    min_cosine = cache.get_drift_check(backend_key)
+    if min_cosine is None:
+        print(f"Checking '{EMBEDDING_BACKEND}' embeddings against the reference model...")
+        min_cosine = check_backend_drift(model)
+        cache.record_drift_check(backend_key, min_cosine)
+    if min_cosine < MIN_BACKEND_COSINE:
+        print(f"Warning: '{EMBEDDING_BACKEND}' backend drifts from the reference model "
+              f"(min cosine {min_cosine:.4f} < {MIN_BACKEND_COSINE}). Falling back to 'torch'.")
+        _active_backend = 'torch'
+        return _load_model('torch')
+    print(f"Using '{EMBEDDING_BACKEND}' embedding backend (min cosine vs reference {min_cosine:.4f}).")
+    _active_backend = EMBEDDING_BACKEND
     return model
 
+def get_embedding_model():
+    """Returns the SentenceTransformer model, loading it on first use."""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                _model = _timed_init('embedding model', _create_model)
+    return _model
+
 def get_chroma_client():
-    """Returns the ChromaDB client."""
-    return chroma_client
+    """Returns the ChromaDB client, opening it on first use."""
+    global _chroma_client
+    if _chroma_client is None:
+        with _chroma_lock:
+            if _chroma_client is None:
+                _chroma_client = _timed_init('ChromaDB client', _create_chroma_client)
+    return _chroma_client
+
+def get_embedding_cache():
+    """Returns the persistent embedding cache, opening it on first use."""
+    global _embedding_cache
+    if _embedding_cache is None:
+        with _cache_lock:
+            if _embedding_cache is None:
+                _embedding_cache = _timed_init('embedding cache', EmbeddingCache)
+    return _embedding_cache
+
+def warm_up(model=True, chroma=True):
+    """
+    Eagerly initializes the heavy components, e.g. at the start of a long
+    job so the first request doesn't pay the loading cost.
+    """
+    if model:
+        get_embedding_model()
+        get_embedding_cache()
+    if chroma:
+        get_chroma_client()
+
+def startup_report():
+    """Prints how long each lazily initialized component took to start."""
+    if not startup_timings:
+        print("Startup report: no embedding components were initialized.")
+        return
+    print("Startup report:")
+    for name, seconds in startup_timings.items():
+        print(f"  {name}: {seconds:.2f}s")
+    print(f"  total: {sum(startup_timings.values()):.2f}s")
 
 def generate_embedding(text: str):
     """Generates a vector embedding for the given text."""
     if not text or not isinstance(text, str):
         return None
-    # The .encode() method returns a numpy array. We convert it to a list for compatibility.
-    return model.encode(text).tolist()
+    return generate_embeddings([text])[0]
+
+def generate_embeddings(texts, batch_size=64):
+    """
+    Generates embeddings for many texts with batched model passes.
+
+    Texts already in the embedding cache are not re-encoded. Returns a list
+    aligned with `texts`; entries for empty or non-string inputs are None.
+    """
+    valid_indices = [i for i, text in enumerate(texts) if text and isinstance(text, str)]
+    embeddings = [None] * len(texts)
+    if not valid_indices:
+        return embeddings
+
+    cache = get_embedding_cache()
+    valid_texts = [texts[i] for i in valid_indices]
+    vectors = cache.get_many(embedding_model_key(), valid_texts)
+
+    # Encode each distinct cache miss once
+    missing_texts = list(dict.fromkeys(text for text, vector in zip(valid_texts, vectors) if vector is None))
+    if missing_texts:
+        # The .encode() method returns numpy arrays. We convert them to lists for compatibility.
+        encoded = [vector.tolist() for vector in get_embedding_model().encode(missing_texts, batch_size=batch_size)]
+        # Keyed after loading: the model may have fallen back to the reference backend
+        cache.put_many(embedding_model_key(), missing_texts, encoded)
+        encoded_by_text = dict(zip(missing_texts, encoded))
+        vectors = [vector if vector is not None else encoded_by_text[text] for text, vector in zip(valid_texts, vectors)]
+
+    for i, vector in zip(valid_indices, vectors):
+        embeddings[i] = vector
+    return embeddings
+
+def store_embeddings(texts, vectors):
+    """
+    Seeds the embedding cache with vectors computed elsewhere (e.g. pooled
+    paragraph vectors), so later generate_embedding(s) calls for these
+    texts need no model pass.
+    """
+    get_embedding_model()  # Resolve the active backend before choosing the cache key
+    get_embedding_cache().put_many(embedding_model_key(), texts, vectors)
 
 def get_or_create_collection(collection_name: str):
     """Gets or creates a ChromaDB collection."""
-    return chroma_client.get_or_create_collection(name=collection_name)
+    return get_chroma_client().get_or_create_collection(name=collection_name)
 
 # Define collection names (constants for consistency)
 ARTICLES_COLLECTION = "cybersecurity_articles"
-PULSES_COLLECTION = "cybersecurity_pulses"
\ No newline at end of file
+PULSES_COLLECTION = "cybersecurity_pulses"
@@ -0,0 +1,142 @@
+# backend/extraction_profiles.py
+
+import threading
+import time
+from urllib.parse import urlparse
+from local_state import LOCAL_STATE_PATH, open_connection
+
+# --- Per-domain extraction profiles ---
+# Keyed by registrable domain without 'www.'; a profile also applies to the
+# domain's subdomains. Every field is optional:
+#   selector        CSS selector of the article body, tried before anything else
+#   strip_tags      extra tags to drop on top of the scraper's defaults
+#   needs_selenium  the page only renders its text in a browser
+#   min_text_chars  when no content selector matches, <body> text shorter
+#                   than this means the page did not really load (consent
+#                   wall, app shell) and is retried in a browser
+#   text_tags       the scrape_articles command joins the text of these tags
+#                   inside the matched element instead of taking all its text
+EXTRACTION_PROFILES = {
+    'darkreading.com': {'selector': 'div#article-main', 'needs_selenium': True},
+    'thehackernews.com': {
+        'selector': 'div.articlebody.clear.cf',
+        'text_tags': ['p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'blockquote', 'li', 'span', 'b', 'strong'],
+    },
+    'securityweek.com': {'needs_selenium': True},
+    'itsecurityguru.org': {'needs_selenium': True},
+    'cdt.org': {'needs_selenium': True},
+    'cisa.gov': {'needs_selenium': True},
+}
+
+DEFAULT_PROFILE = {'selector': None, 'strip_tags': frozenset(), 'needs_selenium': False, 'min_text_chars': 200, 'text_tags': None}
+
+# Generic article-body selectors, tried in order when a domain has no
+# profile selector (or it no longer matches). The one that works for a
+# domain is remembered and tried first on its next page. The first entry is
+# one grouped selector, as the scraper has always used it: whichever of its
+# elements comes first in the document wins, not the first listed.
+FALLBACK_SELECTORS = [
+    'article, .post-content, .entry-content, .article-body',
+    'div.article-content',
+    'div[itemprop="articleBody"]',
+    'div.story-body',
+    'div.main-content',
+    'section.article-body',
+]
+
+
+def normalize_domain(url_or_domain):
+    """Returns the lower-cased host of a URL or domain, without port or a leading 'www.'."""
+    value = url_or_domain.lower()
+    host = urlparse(value).hostname if '//' in value else value.split(':')[0]
+    host = host or ''
+    return host[4:] if host.startswith('www.') else host
+
+
+def get_profile(url_or_domain):
+    """
+    Returns the extraction profile for a URL or domain, merged over
+    DEFAULT_PROFILE. The most specific matching domain wins, so
+    'feeds.example.com' uses a profile for 'example.com' unless it has its own.
+    """
+    host = normalize_domain(url_or_domain)
+    labels = host.split('.')
+    for i in range(len(labels) - 1):
+        profile = EXTRACTION_PROFILES.get('.'.join(labels[i:]))
+        if profile is not None:
+            merged = dict(DEFAULT_PROFILE, **profile)
+            merged['strip_tags'] = frozenset(merged['strip_tags'])
+            return merged
+    return dict(DEFAULT_PROFILE)
+
+
+def needs_selenium(url_or_domain):
+    return get_profile(url_or_domain)['needs_selenium']
+
+
+class LearnedSelectorStore:
+    """
+    Remembers, per domain, which fallback selector last found the article
+    body, so the next page from that domain tries it first instead of
+    missing on the selectors before it.
+
+    Learned selectors are read once into memory; the database is only
+    written when a domain's winning selector changes.
+    """
+
+    def __init__(self, path=LOCAL_STATE_PATH):
+        self._lock = threading.Lock()
+        self._conn = open_connection(path)
+        with self._conn:
+            self._conn.execute(
+                '''CREATE TABLE IF NOT EXISTS learned_selectors (
+                       domain TEXT PRIMARY KEY,
+                       selector TEXT NOT NULL,
+                       learned_at REAL NOT NULL
+                   )'''
+            )
+        self._learned = dict(self._conn.execute('SELECT domain, selector FROM learned_selectors'))
+
+    def get(self, domain):
+        with self._lock:
+            return self._learned.get(normalize_domain(domain))
+
+    def record(self, domain, selector):
+        """Records the selector that matched a page from `domain`."""
+        domain = normalize_domain(domain)
+        with self._lock:
+            if self._learned.get(domain) == selector:
+                return
+            self._learned[domain] = selector
+            with self._conn:
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO learned_selectors (domain, selector, learned_at) VALUES (?, ?, ?)',
+                    (domain, selector, time.time())
+                )
+
+    def forget(self, domain):
+        """Drops a domain's learned selector, e.g. after a site redesign."""
+        domain = normalize_domain(domain)
+        with self._lock, self._conn:
+            self._learned.pop(domain, None)
+            self._conn.execute('DELETE FROM learned_selectors WHERE domain = ?', (domain,))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def selector_chain(url, learned_store=None):
+    """
+    Returns the selectors to try for a page, in order: the profile's
+    selector, the domain's learned fallback, then the remaining fallbacks.
+    """
+    chain = []
+    profile_selector = get_profile(url)['selector']
+    if profile_selector:
+        chain.append(profile_selector)
+    learned = learned_store.get(url) if learned_store else None
+    if learned:
+        chain.append(learned)
+    chain.extend(FALLBACK_SELECTORS)
+    return list(dict.fromkeys(chain))
@@ -0,0 +1,73 @@
+# backend/fake_llm.py
+
+import os
+import re
+import threading
+import time
+from collections import deque
+
+# Simulated seconds per call, so offline runs and benchmarks see a realistic LLM stage
+FAKE_LLM_LATENCY = float(os.getenv('FAKE_LLM_LATENCY', '0'))
+
+
+class FakeRateLimitError(Exception):
+    """Mimics the 429 ResourceExhausted error raised by the Gemini client."""
+
+    def __init__(self, retry_after):
+        super().__init__(f"429 Resource has been exhausted (fake). retry_delay {{ seconds: {retry_after} }}")
+        self.code = 429
+        self.retry_after = retry_after
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeGenerativeModel:
+    """
+    Local stand-in for google.generativeai.GenerativeModel.
+
+    Returns a deterministic, correctly formatted TITLE/BLURB/CONTENT response
+    after a configurable latency, and raises 429 errors when called faster
+    than `rpm` requests per minute, so the dispatcher can be exercised
+    without network access or API quota.
+    """
+
+    # Seconds over which `rpm` is counted; tests shorten it to stay fast.
+    RATE_LIMIT_WINDOW = 60
+
+    def __init__(self, model_name='fake-gemini', latency=FAKE_LLM_LATENCY, rpm=None):
+        self.model_name = model_name
+        self.latency = latency
+        self.rpm = rpm
+        self.calls = 0
+        self._lock = threading.Lock()
+        self._recent_calls = deque()
+
+    def _check_rate_limit(self):
+        if not self.rpm:
+            return
+        with self._lock:
+            now = time.monotonic()
+            while self._recent_calls and now - self._recent_calls[0] >= self.RATE_LIMIT_WINDOW:
+                self._recent_calls.popleft()
+            if len(self._recent_calls) >= self.rpm:
+                raise FakeRateLimitError(retry_after=int(self.RATE_LIMIT_WINDOW - (now - self._recent_calls[0])) + 1)
+            self._recent_calls.append(now)
+
+    def generate_content(self, prompt):
+        self._check_rate_limit()
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+        titles = re.findall(r'### Article Title: (.*)', prompt)
+        topic = titles[0].strip() if titles else 'the latest developments'
+        return FakeResponse(
+            f"TITLE: Daily update on {topic[:60]}\n"
+            f"BLURB: A summary of {len(titles)} articles covering {topic[:80]} and what readers should do next.\n"
+            f"CONTENT: This is a generated placeholder pulse built from {len(titles)} articles.\n\n"
+            f"The prompt was {len(prompt)} characters long."
+        )
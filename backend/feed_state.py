@@ -0,0 +1,191 @@
+# backend/feed_state.py
+
+import calendar
+import json
+import threading
+import time
+from local_state import LOCAL_STATE_PATH, open_connection
+
+# A feed entry that could not be scraped is offered again on this many runs
+# in total before it is given up on (dead links, paywalls, ...).
+MAX_ENTRY_ATTEMPTS = 3
+
+
+def entry_guid(entry):
+    """Returns a stable identifier for a feed entry (its GUID, falling back to its link)."""
+    return entry.get('id') or entry.get('link')
+
+
+def entry_timestamp(entry):
+    """Returns the entry's published (or updated) time as a UNIX timestamp, or None."""
+    parsed = entry.get('published_parsed') or entry.get('updated_parsed')
+    return calendar.timegm(parsed) if parsed else None
+
+
+class FeedStateStore:
+    """
+    Persists per-feed polling state: the ETag and Last-Modified validators
+    for conditional GETs, the newest entry timestamp seen (high-water mark),
+    the GUIDs of the entries in the last fetched copy, and the fetch time.
+    Also counts, per entry GUID, the runs that failed to scrape an entry
+    that is being offered again.
+    """
+
+    def __init__(self, path=LOCAL_STATE_PATH):
+        self._lock = threading.Lock()
+        self._conn = open_connection(path)
+        with self._conn:
+            self._conn.execute(
+                '''CREATE TABLE IF NOT EXISTS feed_state (
+                       feed_url TEXT PRIMARY KEY,
+                       etag TEXT,
+                       modified TEXT,
+                       high_water REAL,
+                       last_guids TEXT,
+                       fetched_at REAL
+                   )'''
+            )
+            self._conn.execute(
+                '''CREATE TABLE IF NOT EXISTS feed_entry_attempts (
+                       feed_url TEXT NOT NULL,
+                       guid TEXT NOT NULL,
+                       attempts INTEGER NOT NULL,
+                       PRIMARY KEY (feed_url, guid)
+                   )'''
+            )
+
+    def get(self, feed_url):
+        """Returns the stored state for a feed as a dict (empty values if never fetched)."""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT etag, modified, high_water, last_guids, fetched_at FROM feed_state WHERE feed_url = ?',
+                (feed_url,)
+            ).fetchone()
+            failed_attempts = dict(self._conn.execute(
+                'SELECT guid, attempts FROM feed_entry_attempts WHERE feed_url = ?', (feed_url,)
+            ).fetchall())
+        if not row:
+            return {'etag': None, 'modified': None, 'high_water': None, 'last_guids': [], 'fetched_at': None,
+                    'failed_attempts': failed_attempts}
+        etag, modified, high_water, last_guids, fetched_at = row
+        return {
+            'etag': etag,
+            'modified': modified,
+            'high_water': high_water,
+            'last_guids': json.loads(last_guids) if last_guids else [],
+            'fetched_at': fetched_at,
+            'failed_attempts': failed_attempts,
+        }
+
+    def save(self, feed_url, state):
+        with self._lock, self._conn:
+            self._conn.execute(
+                '''INSERT OR REPLACE INTO feed_state
+                   (feed_url, etag, modified, high_water, last_guids, fetched_at)
+                   VALUES (?, ?, ?, ?, ?, ?)''',
+                (
+                    feed_url,
+                    state.get('etag'),
+                    state.get('modified'),
+                    state.get('high_water'),
+                    json.dumps(state.get('last_guids') or []),
+                    state.get('fetched_at'),
+                )
+            )
+            self._conn.execute('DELETE FROM feed_entry_attempts WHERE feed_url = ?', (feed_url,))
+            self._conn.executemany(
+                'INSERT INTO feed_entry_attempts (feed_url, guid, attempts) VALUES (?, ?, ?)',
+                [(feed_url, guid, attempts) for guid, attempts in (state.get('failed_attempts') or {}).items()]
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def select_new_entries(feed, state):
+    """
+    Filters a parsed feed down to entries newer than the stored state.
+
+    An entry is new if its GUID was not in the previously fetched copy of the
+    feed and it is not older than the high-water mark. Entries without a date
+    are judged by GUID alone.
+
+    Returns:
+        tuple: (new_entries, updated_state) where updated_state should be
+               saved once the new entries have been handled.
+    """
+    seen_guids = set(state.get('last_guids') or [])
+    high_water = state.get('high_water')
+
+    new_entries = []
+    newest = high_water
+    for entry in feed.entries:
+        published = entry_timestamp(entry)
+        if published is not None:
+            newest = published if newest is None else max(newest, published)
+        if entry_guid(entry) in seen_guids:
+            continue
+        if high_water is not None and published is not None and published < high_water:
+            continue
+        new_entries.append(entry)
+
+    updated_state = {
+        'etag': feed.get('etag'),
+        'modified': feed.get('modified'),
+        'high_water': newest,
+        'last_guids': [entry_guid(entry) for entry in feed.entries],
+        'fetched_at': time.time(),
+        'failed_attempts': dict(state.get('failed_attempts') or {}),
+    }
+    return new_entries, updated_state
+
+
+def reoffer_entries(state, skipped_entries, failed_entries, max_attempts=MAX_ENTRY_ATTEMPTS):
+    """
+    Returns a copy of an updated feed state that offers entries not stored
+    this run again on the next fetch, and the failed entries given up on.
+
+    Entries skipped without an attempt (cut off by max_articles_per_feed)
+    are always offered again. Entries whose scrape or storage failed are
+    offered again until they have failed on `max_attempts` runs, so a dead
+    link is not re-scraped for as long as it stays in the feed.
+
+    Offered entries' GUIDs are left out of last_guids, the high-water mark
+    is held back to the oldest of them, and the conditional-GET validators
+    are dropped so an unchanged feed is still re-parsed. When nothing is
+    offered again the validators are kept.
+
+    Returns:
+        tuple: (state, abandoned_entries)
+    """
+    previous_attempts = state.get('failed_attempts') or {}
+    failed_attempts = {}
+    reoffered = list(skipped_entries)
+    abandoned = []
+    for entry in failed_entries:
+        guid = entry_guid(entry)
+        attempts = previous_attempts.get(guid, 0) + 1
+        if attempts >= max_attempts:
+            abandoned.append(entry)
+        else:
+            failed_attempts[guid] = attempts
+            reoffered.append(entry)
+    # Attempt counts of entries skipped this run carry over unchanged
+    for entry in skipped_entries:
+        guid = entry_guid(entry)
+        if guid in previous_attempts:
+            failed_attempts[guid] = previous_attempts[guid]
+
+    state = dict(state)
+    state['failed_attempts'] = failed_attempts
+    if not reoffered:
+        return state, abandoned
+    reoffered_guids = {entry_guid(entry) for entry in reoffered}
+    state['last_guids'] = [guid for guid in state.get('last_guids') or [] if guid not in reoffered_guids]
+    state['etag'] = None
+    state['modified'] = None
+    timestamps = [ts for ts in (entry_timestamp(entry) for entry in reoffered) if ts is not None]
+    if timestamps and state.get('high_water') is not None:
+        state['high_water'] = min(state['high_water'], min(timestamps))
+    return state, abandoned
@@ -4,15 +4,18 @@ from urllib.parse import urljoin, urlparse
 import xml.etree.ElementTree as ET
 from typing import List, Dict, Optional
 import time
+from http_client import get_session
 
 class RSSFeedDiscovery:
-    def __init__(self, timeout: int = 15, user_agent: str = "RSS Discovery Bot 1.0"):
+    def __init__(self, timeout: int = 15, user_agent: str = "RSS Discovery Bot 1.0", session: Optional[requests.Session] = None):
         self.timeout = timeout
-        self.session = requests.Session()
-        self.session.headers.update({
+        # Reuse the shared pooled session; headers are sent per request so
+        # the discovery bot's identity doesn't leak into other callers.
+        self.session = session or get_session()
+        self.headers = {
             'User-Agent': user_agent,
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8'
-        })
+        }
         
         # Common RSS feed paths to check
         self.common_paths = [
@@ -37,7 +40,7 @@ class RSSFeedDiscovery:
     def is_valid_rss_feed(self, feed_url: str) -> Dict[str, any]:
         """Check if URL returns valid RSS/Atom XML"""
         try:
-            response = self.session.get(feed_url, timeout=self.timeout)
+            response = self.session.get(feed_url, headers=self.headers, timeout=self.timeout)
             response.raise_for_status()
             
             content_type = response.headers.get('content-type', '').lower()
@@ -83,7 +86,7 @@ class RSSFeedDiscovery:
     def find_feeds_in_html(self, base_url: str) -> List[str]:
         """Parse HTML to find RSS feed links"""
         try:
-            response = self.session.get(base_url, timeout=self.timeout)
+            response = self.session.get(base_url, headers=self.headers, timeout=self.timeout)
             response.raise_for_status()
             
             soup = BeautifulSoup(response.content, 'html.parser')
@@ -163,7 +166,7 @@ class RSSFeedDiscovery:
                     else:
                         # For common paths, just check if URL exists
                         try:
-                            response = self.session.head(feed_url, timeout=5)
+                            response = self.session.head(feed_url, headers=self.headers, timeout=5)
                             if response.status_code == 200:
                                 discovered_feeds.append({'url': feed_url, 'source': 'Common Path'})
                         except:
@@ -2,32 +2,49 @@
 
 import os
 import re
-import json
 import time
 from datetime import timedelta, datetime, timezone
 from collections import defaultdict
 from dotenv import load_dotenv
-from supabase import create_client, Client
-import google.generativeai as genai
-from embedding_utils import generate_embedding, get_or_create_collection, PULSES_COLLECTION
+from llm_dispatch import LLMDispatcher, get_generative_model, LLM_BACKEND
+from llm_cache import open_llm_cache, LLM_CACHE_MODE
+from storage import get_client
+from db_utils import chunked, iter_rows
+from dedup import minhash_signature, collapse_duplicates
+from pulse_retrieval import PastPulseRetriever
+from pulse_digests import refresh_day_digest
+from prompt_packing import rank_articles, pack_articles, PULSE_PROMPT_TOKEN_BUDGET
+from embedding_utils import generate_embedding, generate_embeddings, get_or_create_collection, startup_report, PULSES_COLLECTION
 
 # --- Initialize Clients ---
 load_dotenv()
 
-# Supabase
-supabase_url = os.getenv("SUPABASE_URL")
-supabase_key = os.getenv("SUPABASE_SERVICE_KEY")
-if not supabase_url or not supabase_key:
-    raise ValueError("Supabase credentials must be set.")
-supabase: Client = create_client(supabase_url, supabase_key)
-
-# Gemini AI
-gemini_api_key = os.getenv("GOOGLE_API_KEY")
-if not gemini_api_key:
-    raise ValueError("GOOGLE_API_KEY must be set in the .env file.")
-genai.configure(api_key=gemini_api_key)
+# Supabase (or the local stand-in when STORAGE_BACKEND=local)
+supabase = get_client()
+
+# Gemini AI (not needed when running against the local fake or replaying cached responses)
+if LLM_BACKEND != 'fake' and LLM_CACHE_MODE != 'replay':
+    gemini_api_key = os.getenv("GOOGLE_API_KEY")
+    if not gemini_api_key:
+        raise ValueError("GOOGLE_API_KEY must be set in the .env file.")
+    import google.generativeai as genai
+    genai.configure(api_key=gemini_api_key)
 # --- End of Initialization ---
 
+# Article columns used for grouping, de-duplication, ranking and packing
+PULSE_ARTICLE_COLUMNS = 'id, url, title, raw_content, scraped_date, article_categories(category_id)'
+# Number of article ids per `in_` lookup when re-reading a category's contents
+CONTENT_LOOKUP_CHUNK_SIZE = 100
+
+
+def fetch_article_contents(article_ids, chunk_size=CONTENT_LOOKUP_CHUNK_SIZE):
+    """Returns {article id: raw_content} for the given articles."""
+    contents = {}
+    for chunk in chunked(article_ids, chunk_size):
+        response = supabase.table('articles').select('id, raw_content').in_('id', chunk).execute()
+        contents.update((row['id'], row['raw_content']) for row in response.data)
+    return contents
+
 def slugify(text):
     """Converts a string into a URL-friendly slug."""
     text = text.lower().strip()
@@ -35,11 +52,43 @@ def slugify(text):
     return text.strip('-')
 
 
-def generate_pulses(min_articles_for_pulse=3):
+def build_pulse_prompt(category_name, full_combined_text, past_pulses_context=""):
+    """Builds the LLM prompt for one category's daily pulse."""
+    return f"""
+    You are an **expert cybersecurity analyst** and a **dedicated educator** for a leading cybersecurity news platform. Your primary goal is to synthesize complex cybersecurity information into clear, actionable, and highly digestible daily "Pulses" for a broad audience. This audience includes both cybersecurity professionals seeking concise updates and general users who need to understand critical threats and protective measures to make informed decisions in their personal and professional lives.
+
+    You must achieve the following:
+    1.  **Comprehensive Understanding:** Analyze the provided new articles thoroughly, drawing out the most significant developments, evolving technologies, and strategic insights relevant to the specific category: **{category_name}**.
+    2.  **Historical Context (if provided):** If "Relevant Past Pulses" are supplied, use them to:
+        * Establish a historical understanding of the topic's trajectory.
+        * Identify how current events represent continuations, accelerations, or new deviations from past trends.
+        * Highlight the outcomes of previously developing stories or security measures.
+        * Avoid repeating information extensively covered in very recent past pulses, focusing on *new* developments.
+    3.  **Actionable Intelligence:** Emphasize practical implications. What immediate risks should users be aware of? What preventive steps, good habits, or protective measures can they implement based on this information? How does this information impact their decision-making?
+    4.  **Simplicity and Digestibility:** Explain complex cybersecurity concepts, technologies, and strategies using **simple, everyday language that is easy to understand for anyone over the age of 10**, regardless of their technical background or native English proficiency. Avoid jargon wherever possible, or explain it clearly if unavoidable. The goal is deep retention and understanding.
+    5.  **Category Focus:** **CRITICALLY, ensure that the entire pulse content (Title, Blurb, and Content) remains laser-focused on the specific category: {category_name}.** Do NOT drift into broad cybersecurity goals or general threats. Every piece of information must directly pertain to this particular topic, its sub-trends, and actionable advice within its scope.
+    6.  **News Source Integrity:** Remember you are a news source. The information should be factual, derived directly from the provided articles and past pulses. Maintain an informative, authoritative, and helpful tone.
+
+    **STRICTLY adhere to the following output format. Do NOT include any additional text, pleasantries, or explanations outside this format.**
+    **IMPORTANT: Do NOT use any bolding (asterisks), italics, or any other markdown/special formatting in the output, EXCEPT for the colons after TITLE, BLURB, and CONTENT.**
+    **Ensure the generated content is derived directly from the provided articles and, if provided, considers the context of past pulses.**
+    ...
+    --- NEW ARTICLES FOR {category_name.upper()} START ---
+    {full_combined_text}
+    --- NEW ARTICLES FOR {category_name.upper()} END ---
+    {past_pulses_context}
+
+    TITLE: [A concise, impactful title (max 10 words) summarizing the most critical daily update for {category_name}.]
+    BLURB: [A captivating summary (min 20 words, max 120 words) detailing the core points and immediate takeaways from this week's developments in {category_name}. Focus on what users need to know now.]
+    CONTENT: [A detailed, accessible explanation (2-3 paragraphs, min 250 words, max 350 words) expanding on the key aspects, trends, and actionable insights for {category_name} this week. Clearly explain any complex concepts. Use double newlines to separate paragraphs.]
+    """
+
+
+def generate_pulses(min_articles_for_pulse=3, prompt_token_budget=PULSE_PROMPT_TOKEN_BUDGET):
     """Generates daily pulses for categories based on newly categorized articles."""
     print('Starting daily pulse generation...')
     
-    model = genai.GenerativeModel('gemini-2.5-flash')
+    model = get_generative_model('gemini-2.5-flash')
     pulses_collection = get_or_create_collection(PULSES_COLLECTION)
 
     # --- NEW: Fetch recent articles and their categories ---
@@ -47,22 +96,33 @@ def generate_pulses(min_articles_for_pulse=3):
     one_week_ago_dt = datetime.now(timezone.utc) - timedelta(days=7)
     one_week_ago_iso = one_week_ago_dt.isoformat()
 
-    response = supabase.table('articles').select('*, article_categories(category_id)') \
-        .eq('is_categorized', 'true') \
-        .eq('processed_for_pulse', 'false') \
-        .gte('scraped_date', f'"{one_week_ago_iso}"') \
-        .execute()
-        
-    articles = response.data
-    if not articles:
-        print("No new articles available to generate pulses.")
-        return
-
-    # 2. Group articles by their category
+    # Paged by id and consumed page by page: each article's MinHash signature
+    # is computed from its content, then only the small metadata is kept.
+    # Contents are re-read one category at a time below, so memory holds
+    # one category's articles rather than the whole week.
     articles_by_category = defaultdict(list)
-    for article in articles:
-        for cat_link in article.get('article_categories', []):
+    signatures = {}
+    article_count = 0
+    for article in iter_rows(
+        supabase, 'articles', PULSE_ARTICLE_COLUMNS,
+        filters=[
+            ('eq', 'is_categorized', 'true'),
+            ('eq', 'processed_for_pulse', 'false'),
+            ('gte', 'scraped_date', f'"{one_week_ago_iso}"'),
+        ],
+    ):
+        article_count += 1
+        signature = minhash_signature(article.pop('raw_content'))
+        if signature is not None:
+            signatures[article['id']] = signature
+        # 2. Group articles by their category
+        for cat_link in article.pop('article_categories', None) or []:
             articles_by_category[cat_link['category_id']].append(article)
+    if not article_count:
+        print("No new articles available to generate pulses.")
+        return 0
+
+    past_pulse_retriever = PastPulseRetriever(pulses_collection)
 
     # 3. Fetch all category details (name, etc.)
     cat_response = supabase.table('categories').select('id, name').execute()
@@ -71,61 +131,67 @@ def generate_pulses(min_articles_for_pulse=3):
 
     total_pulses_generated = 0
     articles_to_mark_processed = set()
+    prompts = {}
+    packing_report = {}
 
     for category_id, articles_in_cat in articles_by_category.items():
         category_name = category_details.get(category_id, {}).get('name', 'Unknown Category')
         
+        # Cheap pre-check: duplicates can only lower the count
         if len(articles_in_cat) < min_articles_for_pulse:
             print(f'Skipping category "{category_name}" (only {len(articles_in_cat)} articles, needs {min_articles_for_pulse}).')
             continue
 
-        print(f'\n--- Processing Category: {category_name} ({len(articles_in_cat)} articles) ---')
+        print(f'Preparing category: {category_name} ({len(articles_in_cat)} articles)')
+        contents = fetch_article_contents([article['id'] for article in articles_in_cat])
+        articles_in_cat = [dict(article, raw_content=contents.get(article['id']) or '') for article in articles_in_cat]
+
+        # The embeddings were computed during categorization, so these are cache hits.
+        embeddings_by_id = dict(zip(
+            (article['id'] for article in articles_in_cat),
+            generate_embeddings([article['raw_content'] for article in articles_in_cat])
+        ))
 
-        # Combine content and gather article IDs to be marked as processed
-        combined_content = []
+        # Collapse copies of the same story from different outlets into one representative
+        distinct_articles = collapse_duplicates(articles_in_cat, signatures, embeddings=embeddings_by_id)
+        if len(distinct_articles) < len(articles_in_cat):
+            print(f'  Collapsed {len(articles_in_cat)} articles into {len(distinct_articles)} distinct stories.')
+        # Syndicated copies of one story don't make a pulse
+        if len(distinct_articles) < min_articles_for_pulse:
+            print(f'Skipping category "{category_name}" (only {len(distinct_articles)} distinct stories, needs {min_articles_for_pulse}).')
+            continue
+
+        # Gather article IDs to be marked as processed
         for article in articles_in_cat:
-            combined_content.append(f"### Article Title: {article['title']}\n{article['raw_content']}\n---")
             articles_to_mark_processed.add(article['id'])
-        
-        full_combined_text = "\n\n".join(combined_content)
-
-        # RAG implementation (retrieving past pulses from ChromaDB) remains the same...
-        past_pulses_context = "" # Your RAG logic here if you add it back
-
-        # --- The prompt for the AI remains the same ---
-        prompt = f"""
-        You are an **expert cybersecurity analyst** and a **dedicated educator** for a leading cybersecurity news platform. Your primary goal is to synthesize complex cybersecurity information into clear, actionable, and highly digestible daily "Pulses" for a broad audience. This audience includes both cybersecurity professionals seeking concise updates and general users who need to understand critical threats and protective measures to make informed decisions in their personal and professional lives.
-
-        You must achieve the following:
-        1.  **Comprehensive Understanding:** Analyze the provided new articles thoroughly, drawing out the most significant developments, evolving technologies, and strategic insights relevant to the specific category: **{category_name}**.
-        2.  **Historical Context (if provided):** If "Relevant Past Pulses" are supplied, use them to:
-            * Establish a historical understanding of the topic's trajectory.
-            * Identify how current events represent continuations, accelerations, or new deviations from past trends.
-            * Highlight the outcomes of previously developing stories or security measures.
-            * Avoid repeating information extensively covered in very recent past pulses, focusing on *new* developments.
-        3.  **Actionable Intelligence:** Emphasize practical implications. What immediate risks should users be aware of? What preventive steps, good habits, or protective measures can they implement based on this information? How does this information impact their decision-making?
-        4.  **Simplicity and Digestibility:** Explain complex cybersecurity concepts, technologies, and strategies using **simple, everyday language that is easy to understand for anyone over the age of 10**, regardless of their technical background or native English proficiency. Avoid jargon wherever possible, or explain it clearly if unavoidable. The goal is deep retention and understanding.
-        5.  **Category Focus:** **CRITICALLY, ensure that the entire pulse content (Title, Blurb, and Content) remains laser-focused on the specific category: {category_name}.** Do NOT drift into broad cybersecurity goals or general threats. Every piece of information must directly pertain to this particular topic, its sub-trends, and actionable advice within its scope.
-        6.  **News Source Integrity:** Remember you are a news source. The information should be factual, derived directly from the provided articles and past pulses. Maintain an informative, authoritative, and helpful tone.
-
-        **STRICTLY adhere to the following output format. Do NOT include any additional text, pleasantries, or explanations outside this format.**
-        **IMPORTANT: Do NOT use any bolding (asterisks), italics, or any other markdown/special formatting in the output, EXCEPT for the colons after TITLE, BLURB, and CONTENT.**
-        **Ensure the generated content is derived directly from the provided articles and, if provided, considers the context of past pulses.**
-        ...
-        --- NEW ARTICLES FOR {category_name.upper()} START ---
-        {full_combined_text}
-        --- NEW ARTICLES FOR {category_name.upper()} END ---
-        {past_pulses_context}
-
-        TITLE: [A concise, impactful title (max 10 words) summarizing the most critical daily update for {category_name}.]
-        BLURB: [A captivating summary (min 20 words, max 120 words) detailing the core points and immediate takeaways from this week's developments in {category_name}. Focus on what users need to know now.]
-        CONTENT: [A detailed, accessible explanation (2-3 paragraphs, min 250 words, max 350 words) expanding on the key aspects, trends, and actionable insights for {category_name} this week. Clearly explain any complex concepts. Use double newlines to separate paragraphs.]
-        """
-        
+
+        # Rank by centroid similarity and recency, then pack excerpts into the token budget.
+        ranked_articles = rank_articles(distinct_articles, [embeddings_by_id[article['id']] for article in distinct_articles])
+        full_combined_text, packing_stats = pack_articles(ranked_articles, token_budget=prompt_token_budget)
+        packing_report[category_name] = packing_stats
+        print(f"  Packed {packing_stats['included']} articles ({packing_stats['tokens_used']} tokens); "
+              f"truncated {packing_stats['truncated']}, dropped {packing_stats['dropped']} "
+              f"(~{packing_stats['tokens_dropped']} tokens left out).")
+
+        # Retrieve relevant, recent past pulses for this category from ChromaDB
+        query_text = f"{category_name}: " + "; ".join(article['title'] for article in ranked_articles[:5])
+        past_pulses_context = past_pulse_retriever.build_context(category_name, query_text)
+
+        prompts[category_id] = build_pulse_prompt(category_name, full_combined_text, past_pulses_context)
+
+    # --- Send all prompts concurrently, within the API quota ---
+    llm_cache = open_llm_cache()
+    dispatcher = LLMDispatcher(model, cache=llm_cache)
+    print(f'\nSending {len(prompts)} prompts to the LLM (up to {dispatcher.max_concurrency} at a time)...')
+    for category_id, generated_text, error in dispatcher.map(prompts):
+        category_name = category_details.get(category_id, {}).get('name', 'Unknown Category')
+        print(f'\n--- Processing Category: {category_name} ---')
+        if error:
+            print(f'  Error generating pulse for {category_name}: {error}')
+            continue
+
         try:
-            print(f'  Sending combined content for "{category_name}" to LLM...')
-            response = model.generate_content(prompt)
-            generated_text = response.text.strip()
+            generated_text = generated_text.strip()
             
             match = re.search(r"TITLE:\s*(.*?)\s*BLURB:\s*(.*?)\s*CONTENT:\s*(.*)", generated_text, re.DOTALL | re.IGNORECASE)
             if not match:
@@ -155,27 +221,46 @@ def generate_pulses(min_articles_for_pulse=3):
             if pulse_embedding:
                 pulses_collection.add(
                     documents=[content.strip()],
-                    metadatas=[{"pulse_id": new_pulse_id, "category": category_name}],
+                    metadatas=[{"pulse_id": new_pulse_id, "category": category_name, "published_ts": time.time()}],
                     ids=[str(new_pulse_id)],
                     embeddings=[pulse_embedding]
                 )
 
-            print('  Pausing for 60 seconds to respect API rate limits...')
-            time.sleep(60)
+        except Exception as e:
+            print(f'  Error saving pulse for {category_name}: {e}')
 
+    # Condense today's pulses for the weekly roundup now, while the dispatcher is open
+    if total_pulses_generated:
+        try:
+            refresh_day_digest(supabase, dispatcher)
         except Exception as e:
-            print(f'  Error generating or saving pulse for {category_name}: {e}')
+            print(f'  Warning: could not build today\'s digest for the weekly pulse: {e}')
+
+    if llm_cache is not None:
+        cache_stats = llm_cache.stats()
+        print(f"\nLLM response cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses.")
+        llm_cache.close()
 
     # --- NEW: Mark all used articles as processed ---
     if articles_to_mark_processed:
         print(f'\nMarking {len(articles_to_mark_processed)} articles as processed_for_pulse...')
-        supabase.table('articles').update({'processed_for_pulse': True}) \
-            .in_('id', list(articles_to_mark_processed)) \
-            .execute()
+        for chunk in chunked(articles_to_mark_processed):
+            supabase.table('articles').update({'processed_for_pulse': True}) \
+                .in_('id', chunk) \
+                .execute()
     # --- End of New Section ---
 
+    dropped_total = sum(stats['tokens_dropped'] for stats in packing_report.values())
+    if dropped_total:
+        print(f'\nPrompt packing left out ~{dropped_total} tokens in total:')
+        for category_name, stats in packing_report.items():
+            if stats['tokens_dropped']:
+                print(f"  {category_name}: {stats['dropped']} dropped, {stats['truncated']} truncated, ~{stats['tokens_dropped']} tokens")
+
     print(f'\nFinished daily pulse generation. Total pulses generated: {total_pulses_generated}.')
+    return total_pulses_generated
 
 
 if __name__ == "__main__":
-    generate_pulses()
\ No newline at end of file
+    generate_pulses()
+    startup_report()
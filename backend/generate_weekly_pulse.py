@@ -2,68 +2,88 @@
 
 import os
 import re
-from datetime import datetime, timedelta, timezone
+from datetime import datetime, timedelta
 from dotenv import load_dotenv
-from supabase import create_client, Client
-import google.generativeai as genai
+from llm_dispatch import LLMDispatcher, get_generative_model, LLM_BACKEND
+from llm_cache import open_llm_cache, LLM_CACHE_MODE
+from storage import get_client
+from pulse_digests import DigestStore, build_daily_digests, fetch_pulses, format_pulses, group_by_day, utc_day_start
 
 # --- Initialize Clients ---
 load_dotenv()
 
-# Supabase
-supabase_url = os.getenv("SUPABASE_URL")
-supabase_key = os.getenv("SUPABASE_SERVICE_KEY")
-if not supabase_url or not supabase_key:
-    raise ValueError("Supabase credentials must be set.")
-supabase: Client = create_client(supabase_url, supabase_key)
-
-# Gemini AI
-gemini_api_key = os.getenv("GOOGLE_API_KEY")
-if not gemini_api_key:
-    raise ValueError("GOOGLE_API_KEY must be set.")
-genai.configure(api_key=gemini_api_key)
+# Supabase (or the local stand-in when STORAGE_BACKEND=local)
+supabase = get_client()
+
+# Gemini AI (not needed when running against the local fake or replaying cached responses)
+if LLM_BACKEND != 'fake' and LLM_CACHE_MODE != 'replay':
+    gemini_api_key = os.getenv("GOOGLE_API_KEY")
+    if not gemini_api_key:
+        raise ValueError("GOOGLE_API_KEY must be set.")
+    import google.generativeai as genai
+    genai.configure(api_key=gemini_api_key)
 # --- End of Initialization ---
 
 MIN_PULSES_FOR_WEEKLY_SUMMARY = 15
+WEEKLY_MODEL_NAME = 'gemini-1.5-flash'
+
+
+def generate_weekly_pulse(days=7, incremental=True):
+    """
+    Generates a single weekly pulse by summarizing all daily pulses from the past week.
+
+    The window is the `days` whole UTC days before today, so every day in it
+    is complete and its digest (built by the daily job) can be reused.
 
-def generate_weekly_pulse():
-    """Generates a single weekly pulse by summarizing all daily pulses from the past week."""
+    Args:
+        days (int): Size of the window, in days.
+        incremental (bool): Summarize cached per-day digests instead of
+            sending every pulse of the window to the LLM in one prompt.
+    """
     print("Starting weekly pulse generation...")
 
     # 1. Data Collection
-    today = datetime.now(timezone.utc)
-    one_week_ago = today - timedelta(days=7)
+    window_end = utc_day_start()
+    window_start = window_end - timedelta(days=days)
 
     try:
-        response = supabase.table('pulses') \
-            .select('title, blurb, content, published_date') \
-            .gte('published_date', one_week_ago.isoformat()) \
-            .execute()
-
-        # The data is directly in the response object
-        daily_pulses = response.data
-
+        daily_pulses = fetch_pulses(supabase, window_start, window_end)
     except Exception as e:
         raise Exception(f"Error fetching daily pulses: {e}")
 
-    print(f"Found {len(daily_pulses)} daily pulses from the past week.")
+    print(f"Found {len(daily_pulses)} daily pulses from the past {days} days.")
 
     if len(daily_pulses) < MIN_PULSES_FOR_WEEKLY_SUMMARY:
         print(f"Not enough pulses for a weekly summary (found {len(daily_pulses)}, need {MIN_PULSES_FOR_WEEKLY_SUMMARY}). Exiting.")
         return
 
+    model = get_generative_model(WEEKLY_MODEL_NAME)
+    # Responses are cached locally, so a re-run after a failed parse or
+    # insert below does not pay for the same prompts again.
+    llm_cache = open_llm_cache()
+    dispatcher = LLMDispatcher(model, cache=llm_cache)
+
     # 2. Content Structuring
-    structured_content = "=== START OF WEEKLY PULSE DATA ===\n\n"
-    for pulse in sorted(daily_pulses, key=lambda p: p['published_date']):
-        pulse_date = datetime.fromisoformat(pulse['published_date']).strftime('%A, %B %d, %Y')
-        structured_content += f"--- PULSE FROM: {pulse_date} ---\n"
-        structured_content += f"TITLE: {pulse['title']}\n"
-        structured_content += f"BLURB: {pulse['blurb']}\n"
-        structured_content += f"CONTENT: {pulse['content']}\n\n"
-    structured_content += "=== END OF WEEKLY PULSE DATA ==="
+    if incremental:
+        # Map: each day was condensed by the daily job (only missing days are
+        # condensed here); reduce: synthesize the short digests.
+        digest_store = DigestStore()
+        try:
+            digests = build_daily_digests(group_by_day(daily_pulses), dispatcher, digest_store)
+        finally:
+            digest_store.close()
+
+        sections = []
+        for day in sorted(digests):
+            day_label = datetime.fromisoformat(day).strftime('%A, %B %d, %Y')
+            sections.append(f"--- DIGEST OF PULSES FROM: {day_label} ---\n{digests[day]}\n")
+        pulse_data = "\n".join(sections)
+    else:
+        pulse_data = format_pulses(daily_pulses)
+
+    structured_content = f"=== START OF WEEKLY PULSE DATA ===\n\n{pulse_data}\n=== END OF WEEKLY PULSE DATA ==="
 
     # 3. AI-Powered Synthesis (The Prompt)
-    model = genai.GenerativeModel('gemini-1.5-flash')
     prompt = f"""
     You are an executive-level cybersecurity analyst writing a weekly roundup for industry leaders. Your task is to analyze the following collection of daily cybersecurity pulse reports from the past week and synthesize them into a single, cohesive summary.
 
@@ -84,8 +104,11 @@ def generate_weekly_pulse():
     """
 
     print("Sending content to Gemini for synthesis...")
-    response = model.generate_content(prompt)
-    generated_text = response.text.strip()
+    generated_text = dispatcher.generate(prompt).strip()
+    if llm_cache is not None:
+        cache_stats = llm_cache.stats()
+        print(f"LLM response cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses.")
+        llm_cache.close()
 
     # 4. Storing the Weekly Pulse
     match = re.search(r"TITLE:\s*(.*?)\s*BLURB:\s*(.*?)\s*CONTENT:\s*(.*)", generated_text, re.DOTALL | re.IGNORECASE)
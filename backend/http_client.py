@@ -0,0 +1,130 @@
+# backend/http_client.py
+
+import random
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+
+# --- Connection pool settings ---
+# POOL_CONNECTIONS is the number of per-host pools kept alive, POOL_MAXSIZE
+# the number of keep-alive connections kept for each host. POOL_MAXSIZE
+# should be at least the scraper's per-host concurrency cap.
+POOL_CONNECTIONS = 32
+POOL_MAXSIZE = 4
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+# Status codes worth retrying with backoff; anything else is final.
+RETRYABLE_STATUS_CODES = (429, 500, 502, 503, 504)
+# Unread bodies up to this size are drained before a streamed response is
+# closed, so its keep-alive connection goes back to the pool; larger ones
+# are cheaper to drop along with the connection.
+DRAIN_MAX_BYTES = 64 * 1024
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def create_session(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE, headers=None):
+    """Creates a requests.Session with a keep-alive connection pool per host."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers.update(headers or DEFAULT_HEADERS)
+    return session
+
+
+def get_session():
+    """Returns the process-wide pooled session shared by the scraper, feed fetcher and feed discovery."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = create_session()
+    return _session
+
+
+def configure_session(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE, headers=None):
+    """Replaces the shared session, e.g. to size the pools for a larger worker count."""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = create_session(pool_connections, pool_maxsize, headers)
+    return _session
+
+
+def connection_stats(session=None):
+    """
+    Reports connection reuse per origin for a session.
+
+    Returns:
+        dict: (scheme, host, port) -> {'requests': int, 'connections': int, 'reused': int},
+              where 'connections' counts new TCP/TLS connections opened.
+    """
+    session = session or _session
+    stats = {}
+    if session is None:
+        return stats
+
+    for adapter in set(session.adapters.values()):
+        pools = adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            host_stats = stats.setdefault((pool.scheme, pool.host, pool.port), {'requests': 0, 'connections': 0, 'reused': 0})
+            host_stats['requests'] += pool.num_requests
+            host_stats['connections'] += pool.num_connections
+            host_stats['reused'] += max(pool.num_requests - pool.num_connections, 0)
+    return stats
+
+
+def print_connection_stats(session=None):
+    stats = connection_stats(session)
+    if not stats:
+        return
+    total_requests = sum(s['requests'] for s in stats.values())
+    total_connections = sum(s['connections'] for s in stats.values())
+    print(f'HTTP connection reuse: {total_requests} requests over {total_connections} connections '
+          f'across {len(stats)} hosts.')
+
+
+def backoff_delay(attempt, base=1.0, cap=30.0):
+    """
+    Exponential backoff with jitter: the delay ceiling doubles with every
+    attempt (base, 2*base, 4*base, ... up to cap) and the actual delay is
+    drawn from the upper half of that range.
+    """
+    ceiling = min(cap, base * (2 ** attempt))
+    return ceiling / 2 + random.uniform(0, ceiling / 2)
+
+
+def drain_response(response, max_bytes=DRAIN_MAX_BYTES):
+    """
+    Reads and discards the unread body of a streamed response (403 pages,
+    error pages, skipped non-HTML documents), so closing it returns the
+    connection to the pool instead of closing it. Does nothing when the
+    declared length exceeds `max_bytes`.
+    """
+    length = response.headers.get('Content-Length', '')
+    if length.isdigit() and int(length) > max_bytes:
+        return
+    try:
+        response.raw.read(max_bytes, decode_content=False)
+    except Exception:
+        # The connection is simply dropped on close, as before
+        pass
+
+
+def retry_after_seconds(response):
+    """Returns the Retry-After header in seconds if it is given as a number, else None."""
+    value = response.headers.get('Retry-After') if response is not None else None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
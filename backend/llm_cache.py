@@ -0,0 +1,116 @@
+# backend/llm_cache.py
+
+import hashlib
+import os
+import threading
+import time
+from local_state import LOCAL_STATE_PATH, open_connection
+
+# --- LLM response cache ---
+# 'on'      reuse cached responses and store new ones (default)
+# 'off'     always call the model
+# 'replay'  serve cached responses only and never call the model, so a run
+#           can be repeated offline (benchmarks, regression checks); a
+#           prompt with no cached response raises LLMCacheMiss
+LLM_CACHE_MODE = os.getenv('LLM_CACHE_MODE', 'on')
+# Responses older than this are not reused (except in replay mode), so a
+# day's re-run is free but next week's identical prompt is asked afresh.
+LLM_CACHE_TTL_HOURS = float(os.getenv('LLM_CACHE_TTL_HOURS', '72'))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv('LLM_CACHE_MAX_ENTRIES', '5000'))
+
+
+class LLMCacheMiss(Exception):
+    """Raised in replay mode for a prompt that has no cached response."""
+
+
+def prompt_hash(prompt):
+    """Returns the SHA-256 hex digest of a prompt."""
+    return hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    Persistent cache of LLM responses keyed by model name and prompt hash.
+
+    A re-run after a failure further down the line (a parse error, a failed
+    insert) gets the responses it already paid for. Entries expire after
+    `ttl_hours`; beyond `max_entries` the oldest are evicted.
+    """
+
+    def __init__(self, path=LOCAL_STATE_PATH, ttl_hours=LLM_CACHE_TTL_HOURS, max_entries=LLM_CACHE_MAX_ENTRIES, mode=LLM_CACHE_MODE):
+        if mode not in ('on', 'replay'):
+            raise ValueError(f"Unknown LLM_CACHE_MODE '{mode}' for a cache. Use 'on' or 'replay'.")
+        self.ttl_seconds = ttl_hours * 3600
+        self.max_entries = max_entries
+        self.replay = mode == 'replay'
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = open_connection(path)
+        with self._conn:
+            self._conn.execute(
+                '''CREATE TABLE IF NOT EXISTS llm_responses (
+                       model TEXT NOT NULL,
+                       hash TEXT NOT NULL,
+                       response TEXT NOT NULL,
+                       created_at REAL NOT NULL,
+                       PRIMARY KEY (model, hash)
+                   )'''
+            )
+            self._conn.execute('CREATE INDEX IF NOT EXISTS llm_responses_created_at ON llm_responses (created_at)')
+
+    def get(self, model_name, prompt):
+        """Returns the cached response for a prompt, or None. In replay mode a miss raises LLMCacheMiss."""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT response, created_at FROM llm_responses WHERE model = ? AND hash = ?',
+                (model_name, prompt_hash(prompt))
+            ).fetchone()
+            if row and (self.replay or time.time() - row[1] <= self.ttl_seconds):
+                self.hits += 1
+                return row[0]
+            self.misses += 1
+        if self.replay:
+            raise LLMCacheMiss(f"No cached {model_name} response for prompt {prompt_hash(prompt)[:12]} (LLM_CACHE_MODE=replay).")
+        return None
+
+    def put(self, model_name, prompt, response):
+        if self.replay:
+            return
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO llm_responses (model, hash, response, created_at) VALUES (?, ?, ?, ?)',
+                (model_name, prompt_hash(prompt), response, now)
+            )
+            self._conn.execute('DELETE FROM llm_responses WHERE created_at < ?', (now - self.ttl_seconds,))
+            count = self._conn.execute('SELECT COUNT(*) FROM llm_responses').fetchone()[0]
+            if count > self.max_entries:
+                self._conn.execute(
+                    'DELETE FROM llm_responses WHERE rowid IN '
+                    '(SELECT rowid FROM llm_responses ORDER BY created_at ASC LIMIT ?)',
+                    (count - self.max_entries,)
+                )
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM llm_responses').fetchone()[0]
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def open_llm_cache():
+    """Returns an LLMResponseCache for the configured LLM_CACHE_MODE, or None when caching is off."""
+    if LLM_CACHE_MODE == 'off':
+        return None
+    return LLMResponseCache()
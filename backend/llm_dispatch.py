@@ -0,0 +1,167 @@
+# backend/llm_dispatch.py
+
+import math
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from http_client import backoff_delay
+
+# --- Gemini quota (per project, per model) ---
+# Defaults match the gemini-2.5-flash free tier; set these to your actual quota.
+GEMINI_RPM = int(os.getenv('GEMINI_RPM', '10'))
+GEMINI_TPM = int(os.getenv('GEMINI_TPM', '250000'))
+MAX_CONCURRENT_LLM_CALLS = int(os.getenv('MAX_CONCURRENT_LLM_CALLS', '4'))
+
+# 'gemini' (default) or 'fake' for the local stand-in in fake_llm.py
+LLM_BACKEND = os.getenv('LLM_BACKEND', 'gemini')
+
+# Rough characters-per-token ratio for English text, used to charge the
+# token bucket without a network round-trip to count_tokens().
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text):
+    """Approximates the number of tokens in a text."""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def get_generative_model(model_name):
+    """Returns a Gemini model, or the local fake when LLM_BACKEND=fake."""
+    if LLM_BACKEND == 'fake':
+        from fake_llm import FakeGenerativeModel
+        return FakeGenerativeModel(model_name)
+
+    import google.generativeai as genai
+    return genai.GenerativeModel(model_name)
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled continuously at `rate_per_minute`.
+
+    acquire(n) blocks until n tokens are available. The bucket holds about
+    one second's worth of tokens by default, so any sliding minute lets
+    through at most the rate plus that small burst rather than twice the
+    rate. Requests larger than the capacity are allowed once the bucket is
+    full and leave it in debt, so later requests wait for the whole amount
+    to be refilled.
+    """
+
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate_per_second = rate_per_minute / 60.0
+        self.capacity = capacity or max(1, math.ceil(rate_per_minute / 60))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate_per_second)
+        self._updated = now
+
+    def acquire(self, amount=1):
+        needed = min(amount, self.capacity)
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= needed:
+                    self._tokens -= amount
+                    return
+                wait = (needed - self._tokens) / self.rate_per_second
+            time.sleep(wait)
+
+    def drain(self):
+        """Empties the bucket, e.g. after the server reports the quota is exhausted."""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self._tokens, 0)
+
+
+def is_rate_limit_error(error):
+    """True for 429 / ResourceExhausted errors from the Gemini client (or the fake)."""
+    code = getattr(error, 'code', None)
+    if code == 429:
+        return True
+    return type(error).__name__ in ('ResourceExhausted', 'TooManyRequests')
+
+
+def retry_after_from_error(error):
+    """Extracts the server-suggested retry delay in seconds from a rate-limit error, if any."""
+    retry_after = getattr(error, 'retry_after', None)
+    if retry_after is not None:
+        return float(retry_after)
+    match = re.search(r'retry_delay\s*\{\s*seconds:\s*(\d+)', str(error))
+    return float(match.group(1)) if match else None
+
+
+class LLMDispatcher:
+    """
+    Runs many LLM prompts concurrently within the configured quota.
+
+    Every call first takes one request from the RPM bucket and its estimated
+    token count from the TPM bucket. 429 responses are retried after the
+    server's suggested delay (or exponential backoff) without counting
+    against other workers.
+
+    With an LLMResponseCache, prompts the model already answered are served
+    from the cache without taking any quota.
+    """
+
+    def __init__(self, model, rpm=GEMINI_RPM, tpm=GEMINI_TPM, max_concurrency=MAX_CONCURRENT_LLM_CALLS, max_retries=5, cache=None):
+        self.model = model
+        self.model_name = getattr(model, 'model_name', type(model).__name__)
+        self.cache = cache
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        # A burst of one request: N+1 calls can never land in the same minute
+        self.request_bucket = TokenBucket(rpm, capacity=1)
+        self.token_bucket = TokenBucket(tpm)
+
+    def generate(self, prompt):
+        """Sends one prompt, waiting for quota and retrying rate-limit errors. Returns the response text."""
+        if self.cache is not None:
+            cached = self.cache.get(self.model_name, prompt)
+            if cached is not None:
+                return cached
+
+        estimated_tokens = estimate_tokens(prompt)
+        for attempt in range(self.max_retries):
+            self.request_bucket.acquire(1)
+            self.token_bucket.acquire(estimated_tokens)
+            try:
+                text = self.model.generate_content(prompt).text
+            except Exception as e:
+                if not is_rate_limit_error(e) or attempt + 1 == self.max_retries:
+                    raise
+                delay = retry_after_from_error(e) or backoff_delay(attempt, base=2, cap=60)
+                # Our estimate of the quota was too generous; stop other workers too.
+                self.request_bucket.drain()
+                print(f'  Rate limited by the LLM API. Retrying in {delay:.0f}s (attempt {attempt + 1}/{self.max_retries})...')
+                time.sleep(delay)
+                continue
+
+            if self.cache is not None:
+                self.cache.put(self.model_name, prompt, text)
+            return text
+
+    def map(self, prompts):
+        """
+        Dispatches many prompts concurrently.
+
+        Args:
+            prompts (dict): key -> prompt text.
+
+        Yields:
+            tuple: (key, response_text, error) as calls complete; exactly one
+                   of response_text and error is None.
+        """
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            futures = {executor.submit(self.generate, prompt): key for key, prompt in prompts.items()}
+            for future in as_completed(futures):
+                key = futures[future]
+                try:
+                    yield key, future.result(), None
+                except Exception as e:
+                    yield key, None, e
@@ -0,0 +1,25 @@
+# backend/local_state.py
+
+import os
+import sqlite3
+
+# Local, persistent pipeline state (seen URLs, feed caches, ...) lives in a
+# single SQLite file next to the ChromaDB data folder.
+backend_dir = os.path.dirname(os.path.abspath(__file__))
+# Folder for every local state file (state database, embedding cache,
+# ChromaDB, ...); point it elsewhere to run isolated, e.g. for benchmarks.
+LOCAL_STATE_DIR = os.getenv('LOCAL_STATE_DIR', backend_dir)
+LOCAL_STATE_PATH = os.path.join(LOCAL_STATE_DIR, 'local_state.sqlite3')
+
+
+def open_connection(path=LOCAL_STATE_PATH):
+    """
+    Opens a SQLite connection suitable for sharing between worker threads.
+
+    Callers are expected to serialize access with their own lock; WAL mode
+    keeps readers from blocking on writers from other processes.
+    """
+    conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    return conn
@@ -0,0 +1,279 @@
+# backend/pipeline.py
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime, timezone
+from local_state import LOCAL_STATE_DIR
+
+# One sub-folder per run, with a JSON checkpoint per finished stage
+PIPELINE_CHECKPOINT_DIR = os.getenv('PIPELINE_CHECKPOINT_DIR', os.path.join(LOCAL_STATE_DIR, 'pipeline_checkpoints'))
+
+DEFAULT_STAGES = ['warm_up', 'discover', 'categorize', 'daily_pulses']
+
+
+# --- Stages ---
+# Each stage receives the results of the stages that already finished and
+# the run's options, and returns a JSON-serializable result. Stage modules
+# are imported on first use: each one connects to Supabase (and Gemini) at
+# import time.
+
+def run_warm_up(results, options):
+    # Loads the embedding model, its cache and ChromaDB while discovery is
+    # still waiting on the network; every later stage shares them.
+    from embedding_utils import warm_up
+    warm_up()
+
+
+def run_setup_categories(results, options):
+    from setup_categories import setup_categories
+    setup_categories()
+
+
+def run_discover(results, options):
+    from discover_urls import discover_and_scrape
+    if not options.get('streaming'):
+        return discover_and_scrape()
+
+    # Categorize each article as soon as it is stored, overlapping embedding
+    # with the rest of the scraping. The categorize stage then only sweeps
+    # up whatever is left uncategorized.
+    from stream_categorizer import StreamingCategorizer
+    with StreamingCategorizer() as categorizer:
+        return discover_and_scrape(on_article_stored=categorizer.put)
+
+
+def run_categorize(results, options):
+    from categorize_articles import categorize_articles
+    # Newly stored articles come straight from the discovery stage, if it ran.
+    return categorize_articles(articles=results.get('discover'))
+
+
+def run_daily_pulses(results, options):
+    from generate_daily_pulses import generate_pulses
+    return generate_pulses()
+
+
+def run_weekly_pulse(results, options):
+    from generate_weekly_pulse import generate_weekly_pulse
+    generate_weekly_pulse()
+
+
+# name -> (function, stages it depends on). Dependencies that are not part
+# of a run are ignored, so any subset of stages can be run on its own.
+STAGES = {
+    'warm_up': (run_warm_up, []),
+    'setup_categories': (run_setup_categories, ['warm_up']),
+    'discover': (run_discover, []),
+    'categorize': (run_categorize, ['warm_up', 'setup_categories', 'discover']),
+    'daily_pulses': (run_daily_pulses, ['categorize']),
+    'weekly_pulse': (run_weekly_pulse, ['daily_pulses']),
+}
+# Extra dependencies when articles are categorized during discovery: the
+# streaming categorizer loads the categories (and their embeddings) as soon
+# as discovery starts, so they must exist by then.
+STREAMING_DEPENDENCIES = {'discover': ['warm_up', 'setup_categories']}
+# Stages whose effect lives only in this process and must be redone on resume
+UNCHECKPOINTED_STAGES = {'warm_up'}
+
+
+class RunCheckpoints:
+    """
+    Per-run checkpoint folder: a manifest with the run's stages and one
+    JSON file per finished stage holding its result. Resuming a run skips
+    the checkpointed stages and hands their stored results downstream.
+    """
+
+    def __init__(self, run_dir):
+        self.run_dir = run_dir
+        self.run_id = os.path.basename(run_dir)
+
+    @classmethod
+    def create(cls, stages, options=None, root=PIPELINE_CHECKPOINT_DIR):
+        run_id = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+        checkpoints = cls(os.path.join(root, run_id))
+        os.makedirs(checkpoints.run_dir, exist_ok=True)
+        checkpoints._write('manifest.json', {'run_id': run_id, 'stages': stages, 'options': options or {}, 'completed': False})
+        return checkpoints
+
+    @classmethod
+    def open(cls, run_id=None, root=PIPELINE_CHECKPOINT_DIR):
+        """Opens a run by id, or the most recent incomplete run. Returns None if there is none."""
+        if run_id:
+            run_dir = os.path.join(root, run_id)
+            return cls(run_dir) if os.path.isdir(run_dir) else None
+        if not os.path.isdir(root):
+            return None
+        for name in sorted(os.listdir(root), reverse=True):
+            checkpoints = cls(os.path.join(root, name))
+            manifest = checkpoints.manifest()
+            if manifest and not manifest['completed']:
+                return checkpoints
+        return None
+
+    def _path(self, name):
+        return os.path.join(self.run_dir, name)
+
+    def _write(self, name, data):
+        # Write-then-rename, so a crash never leaves a half-written checkpoint
+        temp_path = self._path(name + '.tmp')
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(temp_path, self._path(name))
+
+    def _read(self, name):
+        try:
+            with open(self._path(name), encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def manifest(self):
+        return self._read('manifest.json')
+
+    def load(self, stage):
+        """Returns the stored checkpoint ({'result', 'seconds', ...}) of a finished stage, or None."""
+        return self._read(f'{stage}.json')
+
+    def save(self, stage, result, seconds):
+        self._write(f'{stage}.json', {'stage': stage, 'result': result, 'seconds': seconds, 'finished_at': time.time()})
+
+    def finish(self):
+        manifest = self.manifest()
+        manifest['completed'] = True
+        self._write('manifest.json', manifest)
+
+
+def resolve_stages(requested):
+    """Validates stage names and returns them in dependency order."""
+    unknown = [stage for stage in requested if stage not in STAGES]
+    if unknown:
+        raise ValueError(f"Unknown stage(s): {', '.join(unknown)}. Available: {', '.join(STAGES)}.")
+    # STAGES is declared in dependency order
+    return [stage for stage in STAGES if stage in requested]
+
+
+def stage_dependencies(stage, options):
+    """Returns the stages `stage` depends on under the run's options."""
+    dependencies = list(STAGES[stage][1])
+    if options.get('streaming'):
+        dependencies += STREAMING_DEPENDENCIES.get(stage, [])
+    return dependencies
+
+
+def _run_stage(stage, results, options):
+    print(f'\n=== Stage: {stage} ===')
+    start = time.perf_counter()
+    result = STAGES[stage][0](results, options)
+    return result, time.perf_counter() - start
+
+
+def run_pipeline(stages=DEFAULT_STAGES, resume=None, streaming=False):
+    """
+    Runs the selected stages in one process as a DAG.
+
+    Stages whose dependencies are done run concurrently (e.g. loading the
+    embedding model overlaps with scraping). Results are handed from stage
+    to stage in memory and checkpointed to disk; `resume` ('latest' or a
+    run id) continues an unfinished run from its checkpoints. With
+    `streaming`, articles are categorized while discovery is still running.
+
+    Returns:
+        dict: stage -> result for every stage that finished.
+    """
+    checkpoints = None
+    options = {'streaming': streaming}
+    if resume:
+        checkpoints = RunCheckpoints.open(None if resume == 'latest' else resume)
+        if checkpoints is None:
+            print(f"No unfinished pipeline run found to resume ({resume}); starting a new one.")
+        else:
+            stages = checkpoints.manifest()['stages']
+            options = checkpoints.manifest().get('options', options)
+            print(f"Resuming pipeline run {checkpoints.run_id}.")
+    stages = resolve_stages(stages)
+    if checkpoints is None:
+        checkpoints = RunCheckpoints.create(stages, options)
+        print(f"Starting pipeline run {checkpoints.run_id}: {', '.join(stages)}")
+
+    results = {}
+    done = set()
+    failed = set()
+    timings = {}
+    for stage in stages:
+        checkpoint = checkpoints.load(stage) if stage not in UNCHECKPOINTED_STAGES else None
+        if checkpoint is not None:
+            print(f"Stage '{stage}' already finished in this run; reusing its checkpoint.")
+            results[stage] = checkpoint['result']
+            done.add(stage)
+
+    with ThreadPoolExecutor(max_workers=len(stages)) as executor:
+        running = {}
+        while True:
+            for stage in stages:
+                if stage in done or stage in failed or stage in running.values():
+                    continue
+                dependencies = [d for d in stage_dependencies(stage, options) if d in stages]
+                if any(d in failed for d in dependencies):
+                    print(f"Skipping stage '{stage}': a stage it depends on failed.")
+                    failed.add(stage)
+                elif all(d in done for d in dependencies):
+                    running[executor.submit(_run_stage, stage, dict(results), options)] = stage
+            if not running:
+                break
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                stage = running.pop(future)
+                try:
+                    result, seconds = future.result()
+                except Exception as e:
+                    print(f"Stage '{stage}' failed: {e}")
+                    failed.add(stage)
+                    continue
+                results[stage] = result
+                timings[stage] = seconds
+                done.add(stage)
+                if stage not in UNCHECKPOINTED_STAGES:
+                    checkpoints.save(stage, result, seconds)
+
+    print('\nPipeline summary:')
+    for stage in stages:
+        if stage in timings:
+            print(f'  {stage}: done in {timings[stage]:.1f}s')
+        elif stage in done:
+            print(f'  {stage}: done (from checkpoint)')
+        else:
+            print(f'  {stage}: failed or skipped')
+
+    if failed:
+        raise Exception(f"Pipeline run {checkpoints.run_id} is incomplete ({', '.join(sorted(failed))} did not finish); "
+                        "re-run with --resume to continue it.")
+    checkpoints.finish()
+    return {stage: results[stage] for stage in stages if stage in done}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Runs the backend pipeline stages in one process.')
+    parser.add_argument('--stages', default=','.join(DEFAULT_STAGES),
+                        help=f"Comma-separated stages to run, from: {', '.join(STAGES)}.")
+    parser.add_argument('--resume', nargs='?', const='latest', default=None, metavar='RUN_ID',
+                        help='Resume the latest unfinished run, or the given run id.')
+    parser.add_argument('--streaming', action='store_true',
+                        help='Categorize articles while they are being scraped.')
+    args = parser.parse_args()
+
+    run_pipeline(
+        stages=[stage.strip() for stage in args.stages.split(',') if stage.strip()],
+        resume=args.resume,
+        streaming=args.streaming
+    )
+
+    from embedding_utils import startup_report
+    startup_report()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+# backend/prompt_packing.py
+
+import math
+from datetime import datetime, timezone
+import numpy as np
+from llm_dispatch import estimate_tokens, CHARS_PER_TOKEN
+
+# --- Packing defaults for daily pulse prompts ---
+# Total budget for the article section of one prompt, and the most any
+# single article may take so one long piece can't crowd out the rest.
+PULSE_PROMPT_TOKEN_BUDGET = 30000
+MAX_TOKENS_PER_ARTICLE = 2000
+# Articles that would get fewer tokens than this are dropped, not truncated.
+MIN_EXCERPT_TOKENS = 150
+# Ranking: weight of centroid similarity vs. recency, and the age at which
+# an article's recency score halves.
+CENTROID_WEIGHT = 0.7
+RECENCY_HALF_LIFE_HOURS = 48
+
+
+def _parse_timestamp(value):
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def rank_articles(articles, embeddings, now=None, centroid_weight=CENTROID_WEIGHT, half_life_hours=RECENCY_HALF_LIFE_HOURS):
+    """
+    Orders articles by how central and how recent they are.
+
+    Centrality is the cosine similarity of an article's embedding to the
+    mean embedding of the group; recency decays exponentially with the age
+    of `scraped_date`. Articles without an embedding are ranked last.
+
+    Returns:
+        list: The articles, best first.
+    """
+    now = now or datetime.now(timezone.utc)
+    valid = [i for i, embedding in enumerate(embeddings) if embedding is not None]
+    similarity = {}
+    if valid:
+        matrix = np.array([embeddings[i] for i in valid], dtype=np.float32)
+        matrix /= np.linalg.norm(matrix, axis=1, keepdims=True) + 1e-12
+        centroid = matrix.mean(axis=0)
+        centroid /= np.linalg.norm(centroid) + 1e-12
+        similarity = dict(zip(valid, matrix @ centroid))
+
+    scores = []
+    for i, article in enumerate(articles):
+        scraped = _parse_timestamp(article.get('scraped_date'))
+        age_hours = max((now - scraped).total_seconds() / 3600, 0) if scraped else half_life_hours * 4
+        recency = math.pow(0.5, age_hours / half_life_hours)
+        centrality = float(similarity.get(i, -1.0))
+        scores.append(centroid_weight * centrality + (1 - centroid_weight) * recency)
+
+    order = sorted(range(len(articles)), key=lambda i: scores[i], reverse=True)
+    return [articles[i] for i in order]
+
+
+def truncate_to_tokens(text, max_tokens):
+    """Cuts text to roughly `max_tokens`, preferring a paragraph or sentence boundary."""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    cut = text[:max_tokens * CHARS_PER_TOKEN]
+    for boundary in ('\n\n', '\n', '. '):
+        position = cut.rfind(boundary)
+        if position > len(cut) // 2:
+            return cut[:position + (1 if boundary == '. ' else 0)].rstrip()
+    return cut.rstrip()
+
+
+def format_article(article, content):
+    sources = article.get('sources') or []
+    if len(sources) > 1:
+        # A representative of several near-duplicate reports of the same story
+        return f"### Article Title: {article['title']}\nReported by: {', '.join(sources)}\n{content}\n---"
+    return f"### Article Title: {article['title']}\n{content}\n---"
+
+
+def pack_articles(ranked_articles, token_budget=PULSE_PROMPT_TOKEN_BUDGET, max_tokens_per_article=MAX_TOKENS_PER_ARTICLE, min_excerpt_tokens=MIN_EXCERPT_TOKENS):
+    """
+    Greedily packs article excerpts into a token budget, best-ranked first.
+
+    Returns:
+        tuple: (combined_text, stats) where stats records how many articles
+               were included, truncated and dropped and how many tokens
+               were used and left out.
+    """
+    blocks = []
+    remaining = token_budget
+    stats = {'included': 0, 'truncated': 0, 'dropped': 0, 'tokens_used': 0, 'tokens_dropped': 0}
+
+    for article in ranked_articles:
+        content = article.get('raw_content') or ''
+        full_tokens = estimate_tokens(format_article(article, content))
+        overhead = estimate_tokens(format_article(article, ''))
+        allowed = min(max_tokens_per_article, remaining) - overhead
+
+        if allowed < min_excerpt_tokens and full_tokens > remaining:
+            stats['dropped'] += 1
+            stats['tokens_dropped'] += full_tokens
+            continue
+
+        excerpt = truncate_to_tokens(content, max(allowed, 0))
+        block = format_article(article, excerpt)
+        block_tokens = estimate_tokens(block)
+        if excerpt != content:
+            stats['truncated'] += 1
+            stats['tokens_dropped'] += max(full_tokens - block_tokens, 0)
+
+        blocks.append(block)
+        stats['included'] += 1
+        stats['tokens_used'] += block_tokens
+        remaining -= block_tokens
+
+    return "\n\n".join(blocks), stats
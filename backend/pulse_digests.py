@@ -0,0 +1,163 @@
+# backend/pulse_digests.py
+
+import hashlib
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from local_state import LOCAL_STATE_PATH, open_connection
+
+
+PULSE_COLUMNS = 'id, title, blurb, content, published_date'
+
+
+def pulses_fingerprint(pulses):
+    """Identifies a set of pulses, so a day's digest is rebuilt only when its pulses change."""
+    keys = sorted(f"{pulse.get('id', '')}|{pulse['published_date']}|{pulse['title']}" for pulse in pulses)
+    return hashlib.sha256('\n'.join(keys).encode('utf-8')).hexdigest()
+
+
+class DigestStore:
+    """
+    Persists one condensed digest per calendar day (UTC) of daily pulses.
+
+    A digest is reused as long as the fingerprint of that day's pulses is
+    unchanged, so re-running the weekly job, or a custom N-day window, only
+    summarizes days that are new or changed.
+    """
+
+    def __init__(self, path=LOCAL_STATE_PATH):
+        self._lock = threading.Lock()
+        self._conn = open_connection(path)
+        with self._conn:
+            self._conn.execute(
+                '''CREATE TABLE IF NOT EXISTS pulse_digests (
+                       day TEXT PRIMARY KEY,
+                       fingerprint TEXT NOT NULL,
+                       digest TEXT NOT NULL,
+                       pulse_count INTEGER NOT NULL,
+                       created_at REAL NOT NULL
+                   )'''
+            )
+
+    def get(self, day, fingerprint):
+        """Returns the stored digest for a day if it was built from the same pulses, else None."""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT digest FROM pulse_digests WHERE day = ? AND fingerprint = ?', (day, fingerprint)
+            ).fetchone()
+        return row[0] if row else None
+
+    def save(self, day, fingerprint, digest, pulse_count):
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO pulse_digests (day, fingerprint, digest, pulse_count, created_at) VALUES (?, ?, ?, ?, ?)',
+                (day, fingerprint, digest, pulse_count, time.time())
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def utc_day_start(moment=None):
+    """Returns midnight UTC of the day `moment` (default: now) falls on."""
+    moment = moment or datetime.now(timezone.utc)
+    return moment.astimezone(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def pulse_day(pulse):
+    """Returns the UTC day (YYYY-MM-DD) a pulse was published on."""
+    return datetime.fromisoformat(pulse['published_date']).astimezone(timezone.utc).date().isoformat()
+
+
+def fetch_pulses(client, start, end):
+    """Returns the pulses published in [start, end), both UTC datetimes."""
+    return client.table('pulses') \
+        .select(PULSE_COLUMNS) \
+        .gte('published_date', start.isoformat()) \
+        .lt('published_date', end.isoformat()) \
+        .execute().data
+
+
+def group_by_day(pulses):
+    """Returns {UTC day: pulses published that day}."""
+    pulses_by_day = defaultdict(list)
+    for pulse in pulses:
+        pulses_by_day[pulse_day(pulse)].append(pulse)
+    return dict(pulses_by_day)
+
+
+def format_pulses(pulses):
+    """Formats daily pulses as TITLE/BLURB/CONTENT blocks, oldest first."""
+    blocks = []
+    for pulse in sorted(pulses, key=lambda p: p['published_date']):
+        pulse_date = datetime.fromisoformat(pulse['published_date']).strftime('%A, %B %d, %Y')
+        blocks.append(
+            f"--- PULSE FROM: {pulse_date} ---\n"
+            f"TITLE: {pulse['title']}\n"
+            f"BLURB: {pulse['blurb']}\n"
+            f"CONTENT: {pulse['content']}\n"
+        )
+    return "\n".join(blocks)
+
+
+def build_digest_prompt(day_label, pulses):
+    """Builds the prompt that condenses one day's pulses into a short digest."""
+    return f"""
+    You are a cybersecurity analyst preparing notes for a weekly roundup. Condense the following daily cybersecurity pulse reports from {day_label} into a digest of at most 200 words.
+
+    **Instructions:**
+    1.  Keep every distinct development: threat actors, vulnerabilities (with CVE IDs), affected products or organizations, and notable numbers.
+    2.  Merge reports that describe the same event.
+    3.  Write plain sentences, one development per line. Do not add a title, pleasantries or any formatting.
+
+    **Daily Pulse Data:**
+    {format_pulses(pulses)}
+    """
+
+
+def build_daily_digests(pulses_by_day, dispatcher, digest_store):
+    """
+    Returns {day: digest} for every day, reusing stored digests and only
+    asking the LLM to condense days whose pulses are new or changed.
+    """
+    digests = {}
+    prompts = {}
+    fingerprints = {}
+    for day, pulses in pulses_by_day.items():
+        fingerprints[day] = pulses_fingerprint(pulses)
+        cached = digest_store.get(day, fingerprints[day])
+        if cached is not None:
+            digests[day] = cached
+        else:
+            day_label = datetime.fromisoformat(day).strftime('%A, %B %d, %Y')
+            prompts[day] = build_digest_prompt(day_label, pulses)
+
+    print(f"Reusing {len(digests)} stored daily digests; condensing {len(prompts)} day(s).")
+    for day, digest, error in dispatcher.map(prompts):
+        if error:
+            raise Exception(f"Error condensing pulses from {day}: {error}")
+        digests[day] = digest.strip()
+        digest_store.save(day, fingerprints[day], digests[day], len(pulses_by_day[day]))
+    return digests
+
+
+def refresh_day_digest(client, dispatcher, day_start=None):
+    """
+    Builds and stores the digest of one whole UTC day of pulses (default:
+    today), reusing the stored one if the day's pulses are unchanged.
+
+    Called by the daily job right after it publishes its pulses, so the
+    weekly job finds every day already condensed and only makes its one
+    synthesis call.
+    """
+    day_start = utc_day_start(day_start)
+    pulses = fetch_pulses(client, day_start, day_start + timedelta(days=1))
+    if not pulses:
+        return None
+    digest_store = DigestStore()
+    try:
+        return build_daily_digests(group_by_day(pulses), dispatcher, digest_store).get(day_start.date().isoformat())
+    finally:
+        digest_store.close()
@@ -0,0 +1,101 @@
+# backend/pulse_retrieval.py
+
+import time
+from datetime import datetime, timezone
+from embedding_utils import generate_embedding
+from llm_dispatch import estimate_tokens
+from prompt_packing import truncate_to_tokens
+
+# --- Retrieval defaults for past-pulse context ---
+PAST_PULSES_TOP_K = 3
+# Nearest neighbours fetched before recency re-weighting picks the top k
+PAST_PULSES_CANDIDATES = 10
+PAST_PULSES_TOKEN_BUDGET = 3000
+# Age at which a past pulse's relevance is halved
+PAST_PULSE_HALF_LIFE_DAYS = 14
+# Pulses indexed before timestamps were stored get this recency weight
+UNKNOWN_AGE_RECENCY = 0.25
+
+
+class PastPulseRetriever:
+    """
+    Retrieves relevant past pulses for a category from the Chroma pulses
+    collection: a category-filtered nearest-neighbour query, re-ranked by
+    similarity times an exponential recency weight.
+
+    Query embeddings are cached for the lifetime of the retriever (one run),
+    so repeated lookups for the same query text don't re-encode.
+    """
+
+    def __init__(self, pulses_collection, half_life_days=PAST_PULSE_HALF_LIFE_DAYS):
+        self.collection = pulses_collection
+        self.half_life_days = half_life_days
+        self._query_embeddings = {}
+
+    def _embed_query(self, query_text):
+        if query_text not in self._query_embeddings:
+            self._query_embeddings[query_text] = generate_embedding(query_text)
+        return self._query_embeddings[query_text]
+
+    def retrieve(self, category_name, query_text, top_k=PAST_PULSES_TOP_K, candidates=PAST_PULSES_CANDIDATES):
+        """
+        Returns up to `top_k` past pulses as dicts with 'document', 'published_ts'
+        and 'score', best first.
+        """
+        query_embedding = self._embed_query(query_text)
+        if query_embedding is None:
+            return []
+        try:
+            result = self.collection.query(
+                query_embeddings=[query_embedding],
+                n_results=candidates,
+                where={"category": category_name},
+                include=['documents', 'metadatas', 'distances'],
+            )
+        except Exception as e:
+            print(f'  Warning: Past pulse lookup failed for {category_name}: {e}')
+            return []
+
+        now = time.time()
+        hits = []
+        for document, metadata, distance in zip(result['documents'][0], result['metadatas'][0], result['distances'][0]):
+            # The collection uses squared L2 distance; for unit vectors that is 2 - 2 * cosine.
+            similarity = 1 - distance / 2
+            published_ts = (metadata or {}).get('published_ts')
+            if published_ts:
+                age_days = max(now - published_ts, 0) / 86400
+                recency = 0.5 ** (age_days / self.half_life_days)
+            else:
+                recency = UNKNOWN_AGE_RECENCY
+            hits.append({'document': document, 'published_ts': published_ts, 'score': similarity * recency})
+
+        hits.sort(key=lambda hit: hit['score'], reverse=True)
+        return hits[:top_k]
+
+    def build_context(self, category_name, query_text, token_budget=PAST_PULSES_TOKEN_BUDGET, top_k=PAST_PULSES_TOP_K):
+        """Formats the retrieved past pulses for the prompt, within `token_budget`. Returns "" if none."""
+        hits = self.retrieve(category_name, query_text, top_k=top_k)
+        if not hits:
+            return ""
+
+        blocks = []
+        remaining = token_budget
+        for hit in hits:
+            date_label = (
+                datetime.fromtimestamp(hit['published_ts'], tz=timezone.utc).strftime('%B %d, %Y')
+                if hit['published_ts'] else 'an earlier date'
+            )
+            header = f"### Past Pulse from {date_label}\n"
+            allowed = remaining - estimate_tokens(header)
+            if allowed <= 0:
+                break
+            block = header + truncate_to_tokens(hit['document'], allowed)
+            blocks.append(block)
+            remaining -= estimate_tokens(block)
+
+        joined = "\n\n".join(blocks)
+        return (
+            f"--- RELEVANT PAST PULSES FOR {category_name.upper()} START ---\n"
+            f"{joined}\n"
+            f"--- RELEVANT PAST PULSES FOR {category_name.upper()} END ---"
+        )
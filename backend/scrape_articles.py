@@ -4,6 +4,7 @@ import requests
 from bs4 import BeautifulSoup
 from django.core.management.base import BaseCommand, CommandError
 import re # Make sure this is imported for the text cleaning regex
+from extraction_profiles import LearnedSelectorStore, get_profile, selector_chain
 
 class Command(BaseCommand):
     help = 'Scrapes the main article content from a given URL.'
@@ -22,17 +23,18 @@ class Command(BaseCommand):
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
 
+        learned_store = LearnedSelectorStore()
         try:
             response = requests.get(url, headers=headers, timeout=10)
             response.raise_for_status()
 
             soup = BeautifulSoup(response.text, 'html.parser')
 
-            article_content = self._extract_main_content(soup)
+            article_content = self._extract_main_content(soup, url, learned_store)
 
             if not article_content:
                 # Add more specific debugging if content is not found
-                self.stdout.write(self.style.ERROR(f"Could not find main article content on {url}. Inspect HTML of the target page for div.articlebody.clear.cf and its children."))
+                self.stdout.write(self.style.ERROR(f"Could not find main article content on {url}. Check its profile in extraction_profiles.py."))
                 # You might want to print a snippet of the raw HTML here for deeper debugging
                 # self.stdout.write(self.style.ERROR(f"Snippet of HTML body: {response.text[:2000]}"))
                 raise CommandError(f"Scraping failed for {url}.")
@@ -52,73 +54,38 @@ class Command(BaseCommand):
             raise CommandError(f"Network or HTTP error during scraping: {e}")
         except Exception as e:
             raise CommandError(f"An unexpected error occurred: {e}")
+        finally:
+            learned_store.close()
 
-    def _extract_main_content(self, soup):
-        """
-        Custom extraction for thehackernews.com based on identified HTML structure.
-        Looks for 'div.articlebody.clear.cf' and concatenates text from its relevant children.
-        """
-        # 1. Find the main article body container
-        article_body_div = soup.select_one('div.articlebody.clear.cf')
-
-        if not article_body_div:
-            # Fallback to general selectors if the specific div isn't found
-            self.stdout.write(self.style.WARNING("Specific 'div.articlebody.clear.cf' not found. Trying general selectors."))
-            # Call the old general logic if the specific one fails
-            return self._extract_general_content(soup)
-
-
-        # 2. Define tags that typically contain readable content
-        # Add other tags if you see them holding content (e.g., 'li' for lists)
-        content_tags = ['p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'blockquote', 'li', 'span', 'b', 'strong']
-
-        extracted_paragraphs = []
-
-        # 3. Iterate through all child elements of the article body div
-        # and collect text from relevant tags.
-        for element in article_body_div.find_all(content_tags):
-            # Clean up the text by removing extra spaces and newlines
-            text = element.get_text(separator=' ', strip=True) # Use space separator to avoid words merging
-            if text:
-                extracted_paragraphs.append(text)
-
-        # 4. Join the extracted parts. Use double newlines to simulate paragraph breaks.
-        full_text = '\n\n'.join(extracted_paragraphs)
+    # Tags dropped from the matched element in addition to the profile's strip_tags
+    NOISE_TAGS = ['script', 'style', 'nav', 'footer', 'header', 'aside']
 
-        # 5. Clean up the final text further:
-        # Remove excessive whitespace and normalize newlines
-        full_text = re.sub(r'\s*\n\s*', '\n', full_text).strip() # Replace multi-line breaks with single
-        full_text = re.sub(r'\n{3,}', '\n\n', full_text) # Ensure no more than two newlines between blocks
-
-        return full_text if full_text else None
-
-    # This method is extracted from the previous version as a fallback
-    def _extract_general_content(self, soup):
+    def _extract_main_content(self, soup, url, learned_store=None):
         """
-        A general fallback method to extract content using common HTML patterns.
-        Used if the specific thehackernews.com selector fails.
+        Extracts the article body using the domain's extraction profile (see
+        extraction_profiles.py): the profile selector first, then the
+        domain's learned selector and the generic fallback selectors, then
+        all paragraphs. A fallback that matches is recorded in
+        `learned_store`, as the pipeline scraper does.
         """
-        selectors = [
-            'div.entry-content',
-            'div.article-content',
-            'div.post-content',
-            'div[itemprop="articleBody"]',
-            'article',
-            'div.story-body',
-            'div.main-content',
-            'section.article-body',
-            'body'
-        ]
-
-        for selector in selectors:
+        profile = get_profile(url)
+        for selector in selector_chain(url, learned_store) + ['body']:
             element = soup.select_one(selector)
-            if element:
-                for script_or_style in element(['script', 'style', 'nav', 'footer', 'header', 'aside']):
-                    script_or_style.decompose()
-
-                text = element.get_text(separator='\n', strip=True)
-                text = re.sub(r'\n\s*\n', '\n\n', text)
-                return text.strip()
+            if not element:
+                continue
+            if selector != profile['selector']:
+                self.stdout.write(self.style.WARNING(f"Matched fallback selector '{selector}'."))
+                if learned_store is not None and selector != 'body':
+                    learned_store.record(url, selector)
+            for noise in element(self.NOISE_TAGS + sorted(profile['strip_tags'])):
+                noise.decompose()
+
+            if selector == profile['selector'] and profile['text_tags']:
+                return self._join_tag_text(element, profile['text_tags'])
+
+            text = element.get_text(separator='\n', strip=True)
+            text = re.sub(r'\n\s*\n', '\n\n', text)
+            return text.strip() or None
 
         paragraphs = soup.find_all('p')
         if paragraphs:
@@ -126,4 +93,21 @@ class Command(BaseCommand):
             if full_text:
                 return full_text.strip()
 
-        return None
\ No newline at end of file
+        return None
+
+    def _join_tag_text(self, element, text_tags):
+        """
+        Joins the text of every `text_tags` element inside `element`, one
+        block per tag, for sites whose body mixes article text with widgets.
+        """
+        extracted_paragraphs = []
+        for child in element.find_all(text_tags):
+            # Space separator so inline markup doesn't merge words
+            text = child.get_text(separator=' ', strip=True)
+            if text:
+                extracted_paragraphs.append(text)
+
+        full_text = '\n\n'.join(extracted_paragraphs)
+        full_text = re.sub(r'\s*\n\s*', '\n', full_text).strip()
+        full_text = re.sub(r'\n{3,}', '\n\n', full_text)
+        return full_text or None
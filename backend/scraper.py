@@ -2,81 +2,230 @@
 
 import time
 import requests
-from bs4 import BeautifulSoup
+from lxml import etree
+from lxml.cssselect import CSSSelector
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from http_client import get_session, backoff_delay, drain_response, retry_after_seconds, RETRYABLE_STATUS_CODES
+# Site-specific selectors, tags to strip and Selenium needs live in the profile registry
+from extraction_profiles import get_profile, selector_chain
 
-# --- NEW: Centralized selectors for specific sites ---
-SITE_SPECIFIC_SELECTORS = {
-    'darkreading.com': 'div#article-main',
-    # Add other site-specific selectors here as needed
-    # 'bleepingcomputer.com': 'div.article-body', 
+# --- Streaming HTML extraction limits ---
+# Stop reading a page after this many bytes; article text sits well within it.
+MAX_RESPONSE_BYTES = 3 * 1024 * 1024
+STREAM_CHUNK_SIZE = 64 * 1024
+HTML_CONTENT_TYPES = ('text/html', 'application/xhtml+xml')
+# Subtrees emptied as soon as the parser closes them; they never hold article
+# text. Besides script/style/nav: inline <svg> only carries icon labels, and
+# <template>/<iframe> content is never rendered in place. <form> and
+# <noscript> are kept: some sites wrap the whole body, or their article
+# fallback, in them.
+STRIPPED_TAGS = frozenset(['script', 'style', 'nav', 'svg', 'template', 'iframe'])
+
+_compiled_selectors = {}
+
+def compile_selector(selector):
+    """Returns a cached, compiled lxml CSS selector."""
+    if selector not in _compiled_selectors:
+        _compiled_selectors[selector] = CSSSelector(selector)
+    return _compiled_selectors[selector]
+
+def element_text(element):
+    """Equivalent of BeautifulSoup's get_text(separator='\\n', strip=True) for an lxml element."""
+    return '\n'.join(text.strip() for text in element.itertext() if text.strip())
+
+def extract_text_from_stream(chunks, selectors, strip_tags=STRIPPED_TAGS, encoding=None, max_bytes=MAX_RESPONSE_BYTES, source=''):
+    """
+    Incrementally parses streamed HTML and returns the text of the first
+    element matching the first selector in `selectors` that matches at all,
+    or of <body> if none does.
+
+    Subtrees whose tag is in `strip_tags` (script, style, nav, ...) are
+    emptied as soon as they are parsed, and reading stops after `max_bytes`,
+    so large pages with heavy inline scripts cost far less memory and CPU
+    than a full soup.
+
+    Returns:
+        tuple: (text, selector) where selector is the one that matched, or
+               None if the body fallback was used. text is None if the
+               document could not be parsed.
+    """
+    parser = etree.HTMLPullParser(events=('end',), encoding=encoding, remove_comments=True, remove_pis=True)
+    received = 0
+
+    def drop_noise():
+        for _, element in parser.read_events():
+            if element.tag in strip_tags:
+                element.clear(keep_tail=True)
+
+    for chunk in chunks:
+        parser.feed(chunk)
+        drop_noise()
+        received += len(chunk)
+        if received >= max_bytes:
+            print(f"Response for {source} exceeded {max_bytes} bytes; parsing the first part only.")
+            break
+
+    try:
+        root = parser.close()
+    except etree.XMLSyntaxError:
+        # Empty or unparseable document
+        return None, None
+    drop_noise()
+    if root is None:
+        return None, None
+
+    for selector in selectors:
+        matches = compile_selector(selector)(root)
+        if matches:
+            return element_text(matches[0]), selector
+    # Fallback if no specific selectors match
+    body = root.find('body')
+    return (element_text(body) if body is not None else None), None
+
+# --- Resource types that can be blocked during Selenium page loads ---
+# Article text never depends on these, and skipping them cuts load time,
+# bandwidth and per-driver memory.
+BLOCKABLE_RESOURCE_PATTERNS = {
+    'images': ['*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.svg', '*.ico', '*.avif'],
+    'media': ['*.mp4', '*.webm', '*.mp3', '*.ogg', '*.wav', '*.m3u8'],
+    'fonts': ['*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot'],
+    'stylesheets': ['*.css'],
 }
+DEFAULT_BLOCKED_RESOURCES = ('images', 'media', 'fonts')
+
+def initialize_chrome_driver(block_resources=()):
+    """
+    Initializes a Selenium Chrome WebDriver for running in a server environment.
 
-def initialize_chrome_driver():
-    """Initializes a Selenium Chrome WebDriver for running in a server environment."""
+    Args:
+        block_resources (iterable): Keys of BLOCKABLE_RESOURCE_PATTERNS whose
+            requests should be blocked during page loads.
+    """
     chrome_options = Options()
     chrome_options.add_argument("--headless")
     chrome_options.add_argument("--no-sandbox")
     chrome_options.add_argument("--disable-dev-shm-usage")
+    # Return control once the DOM is ready instead of waiting for every subresource.
+    chrome_options.page_load_strategy = 'eager'
+    if 'images' in block_resources:
+        chrome_options.add_experimental_option(
+            "prefs", {"profile.managed_default_content_settings.images": 2}
+        )
     try:
         driver = webdriver.Chrome(options=chrome_options)
+        blocked_patterns = [p for r in block_resources for p in BLOCKABLE_RESOURCE_PATTERNS.get(r, [])]
+        if blocked_patterns:
+            driver.execute_cdp_cmd('Network.enable', {})
+            driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': blocked_patterns})
         return driver
     except Exception as e:
         print(f"Failed to initialize Chrome WebDriver: {e}")
         return None
 
-def scrape_article_content(url, chrome_driver=None, force_selenium_for_this_url=False, timeout=15, max_retries=3, delay_range=(1,3)):
-    """Scrapes the main content of an article from a given URL."""
-    domain = requests.utils.urlparse(url).netloc
-    
+def extract_article_text(chunks, url, learned_store=None, encoding=None):
+    """
+    Extracts article text from HTML chunks using the URL's extraction
+    profile: its selector and strip tags first, then learned and generic
+    fallback selectors. A fallback that matches is recorded in
+    `learned_store` so the domain's next page tries it first.
+
+    Returns:
+        tuple: (text, selector) as from extract_text_from_stream; selector
+               is None if no content selector matched and <body> was used.
+    """
+    profile = get_profile(url)
+    text, matched = extract_text_from_stream(
+        chunks, selector_chain(url, learned_store), strip_tags=STRIPPED_TAGS | profile['strip_tags'],
+        encoding=encoding, source=url
+    )
+    if learned_store is not None and matched and matched != profile['selector']:
+        learned_store.record(url, matched)
+    return text, matched
+
+def _scrape_article(url, chrome_driver, force_selenium_for_this_url, timeout, max_retries, backoff_base, backoff_cap, learned_store):
+    """Does the work of scrape_article_content; returns (text, matched selector)."""
     if force_selenium_for_this_url and chrome_driver:
         print(f"Using Selenium for {url}")
+        # Errors from the browser itself (crashed or hung Chrome, lost
+        # session) propagate, so the driver pool discards the driver
+        # instead of handing it to the next page.
+        chrome_driver.get(url)
+        selector = get_profile(url)['selector']
         try:
-            chrome_driver.get(url)
-            selector = SITE_SPECIFIC_SELECTORS.get(domain)
-            
             if selector:
                 # Wait for the specific content element to be present
                 wait = WebDriverWait(chrome_driver, timeout)
                 wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, selector)))
-                content_element = chrome_driver.find_element(By.CSS_SELECTOR, selector)
-                return content_element.get_attribute('innerText')
-            else:
-                 # If no specific selector, fall back to the whole body after load
-                print(f"No specific selector for {domain}. Getting full page source via Selenium.")
-                return chrome_driver.find_element(By.TAG_NAME, 'body').get_attribute('innerText')
-
+        except TimeoutException:
+            print(f"Selenium scraping failed for {url}: '{selector}' did not appear within {timeout}s.")
+            return None, None # If Selenium fails, we don't fall back to requests
+        page_source = chrome_driver.page_source
+        try:
+            # The rendered page goes through the same profile-driven extraction as plain HTTP pages
+            return extract_article_text([page_source.encode('utf-8')], url, learned_store, encoding='utf-8')
         except Exception as e:
             print(f"Selenium scraping failed for {url}: {e}")
-            return None # If Selenium fails, we don't fall back to requests
+            return None, None
 
     # --- Standard requests-based scraping (for sites that don't need Selenium) ---
-    headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'}
+    # Uses the shared pooled session so articles on the same host reuse one
+    # keep-alive connection instead of a new TCP/TLS handshake each time.
+    session = get_session()
     for attempt in range(max_retries):
         try:
-            response = requests.get(url, headers=headers, timeout=timeout)
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.content, 'lxml')
-                selector = SITE_SPECIFIC_SELECTORS.get(domain, 'article, .post-content, .entry-content, .article-body') # Default selectors
-                
-                content_area = soup.select_one(selector)
-                if content_area:
-                    return content_area.get_text(separator='\n', strip=True)
+            # Stream the body so oversized or non-HTML responses are never fully downloaded
+            with session.get(url, timeout=timeout, stream=True) as response:
+                if response.status_code != 200:
+                    # Keep the connection for the host's next page
+                    drain_response(response)
                 else:
-                    # Fallback if no specific selectors match
-                    return soup.body.get_text(separator='\n', strip=True) if soup.body else None
+                    content_type = response.headers.get('Content-Type', '').lower()
+                    if content_type and not content_type.startswith(HTML_CONTENT_TYPES):
+                        print(f"Skipping {url}: not an HTML page ({content_type}).")
+                        drain_response(response)
+                        return None, None
+
+                    encoding = response.encoding if 'charset=' in content_type else None
+                    return extract_article_text(
+                        response.iter_content(chunk_size=STREAM_CHUNK_SIZE), url, learned_store, encoding=encoding
+                    )
 
-            elif response.status_code == 403:
+            if response.status_code == 403:
                 print(f"Anti-bot measure detected (403) for URL: {url}")
-                # This would be the place to trigger a Selenium retry if desired
-                return None 
+                # Not retried over HTTP; tiered_fetcher.fetch_article escalates blocked pages to Selenium
+                return None, None
+
+            elif response.status_code in RETRYABLE_STATUS_CODES:
+                delay = retry_after_seconds(response) or backoff_delay(attempt, backoff_base, backoff_cap)
+                print(f"Got HTTP {response.status_code} for {url} on attempt {attempt + 1}. Retrying in {delay:.1f}s.")
+                time.sleep(min(delay, backoff_cap))
+
+            else:
+                print(f"Got HTTP {response.status_code} for {url}. Giving up.")
+                return None, None
 
         except requests.RequestException as e:
             print(f"Request failed for {url} on attempt {attempt + 1}: {e}")
-            time.sleep(delay_range[0])
+            time.sleep(backoff_delay(attempt, backoff_base, backoff_cap))
             
-    return None # Return None if all retries fail
\ No newline at end of file
+    return None, None # All retries failed
+
+def scrape_article_content(url, chrome_driver=None, force_selenium_for_this_url=False, timeout=15, max_retries=3, backoff_base=1, backoff_cap=30, learned_store=None, return_match=False):
+    """
+    Scrapes the main content of an article from a given URL.
+
+    With `return_match`, returns (text, selector) where selector is the
+    content selector that matched, or None if the whole <body> was used.
+
+    With Selenium, a WebDriverException from the browser itself is raised
+    rather than swallowed, so the caller can discard the broken driver.
+    """
+    text, matched = _scrape_article(
+        url, chrome_driver, force_selenium_for_this_url, timeout, max_retries, backoff_base, backoff_cap, learned_store
+    )
+    return (text, matched) if return_match else text
@@ -0,0 +1,63 @@
+# backend/seen_urls.py
+
+import threading
+import time
+from local_state import LOCAL_STATE_PATH, open_connection
+
+
+class SeenUrlIndex:
+    """
+    Persistent local index of URLs that are already stored in Supabase.
+
+    Checking this index first lets the discovery step drop known URLs without
+    a network round-trip; only URLs it has never seen are sent to Supabase.
+    """
+
+    def __init__(self, path=LOCAL_STATE_PATH):
+        self._lock = threading.Lock()
+        self._conn = open_connection(path)
+        with self._conn:
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS seen_urls (url TEXT PRIMARY KEY, seen_at REAL NOT NULL)'
+            )
+
+    def __contains__(self, url):
+        with self._lock:
+            row = self._conn.execute('SELECT 1 FROM seen_urls WHERE url = ?', (url,)).fetchone()
+        return row is not None
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM seen_urls').fetchone()[0]
+
+    def filter_unseen(self, urls):
+        """Returns the URLs not present in the index, preserving order and dropping duplicates."""
+        unique_urls = list(dict.fromkeys(urls))
+        if not unique_urls:
+            return []
+
+        seen = set()
+        with self._lock:
+            # Stay well below SQLite's bound-parameter limit.
+            for i in range(0, len(unique_urls), 500):
+                chunk = unique_urls[i:i + 500]
+                placeholders = ','.join('?' * len(chunk))
+                rows = self._conn.execute(f'SELECT url FROM seen_urls WHERE url IN ({placeholders})', chunk)
+                seen.update(row[0] for row in rows)
+        return [url for url in unique_urls if url not in seen]
+
+    def add_many(self, urls):
+        """Records URLs as seen."""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                'INSERT OR IGNORE INTO seen_urls (url, seen_at) VALUES (?, ?)',
+                [(url, now) for url in urls]
+            )
+
+    def add(self, url):
+        self.add_many([url])
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
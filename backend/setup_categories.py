@@ -1,27 +1,14 @@
 # backend/setup_categories.py
 
-import os
 import json
-from dotenv import load_dotenv
-from supabase import create_client, Client
 # Assuming your embedding utility is in the same folder or accessible
-from embedding_utils import generate_embedding 
+from embedding_utils import generate_embedding, startup_report
+from storage import get_client
 
-# --- New: Initialize Supabase Client ---
-# Load environment variables from the .env file
-load_dotenv() 
-
-# Get the Supabase URL and Key from the environment
-supabase_url = os.getenv("SUPABASE_URL")
-supabase_key = os.getenv("SUPABASE_SERVICE_KEY")
-
-# Check if the credentials are set
-if not supabase_url or not supabase_key:
-    raise ValueError("Supabase URL and Key must be set in the .env file.")
-
-# Create the Supabase client
-supabase: Client = create_client(supabase_url, supabase_key)
-# --- End of New Section ---
+# --- Initialize Supabase Client ---
+# Credentials come from the .env file; STORAGE_BACKEND=local uses a local SQLite stand-in instead.
+supabase = get_client()
+# --- End of Initialization ---
 
 
 PREDEFINED_CATEGORIES = [
@@ -86,4 +73,5 @@ def setup_categories():
 if __name__ == "__main__":
     # Make sure your embedding utility file (e.g., embedding_utils.py)
     # is in this same 'backend' folder.
-    setup_categories()
\ No newline at end of file
+    setup_categories()
+    startup_report()
@@ -0,0 +1,361 @@
+# backend/storage.py
+
+import json
+import os
+import re
+import threading
+from dotenv import load_dotenv
+from local_state import LOCAL_STATE_DIR, open_connection
+
+load_dotenv()
+
+# 'supabase' (default) or 'local' for the SQLite stand-in below, which needs
+# no credentials or network and is used for benchmarks and offline runs.
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'supabase')
+LOCAL_DB_PATH = os.getenv('LOCAL_DB_PATH', os.path.join(LOCAL_STATE_DIR, 'local_supabase.sqlite3'))
+
+# Tables the backend uses, mirroring the Supabase schema. Timestamps are
+# ISO-8601 UTC strings, as PostgREST returns them.
+LOCAL_SCHEMA = """
+CREATE TABLE IF NOT EXISTS categories (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL UNIQUE,
+    embedding TEXT,
+    created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+);
+CREATE TABLE IF NOT EXISTS articles (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    url TEXT NOT NULL UNIQUE,
+    title TEXT,
+    raw_content TEXT,
+    scraped_date TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+    is_categorized INTEGER NOT NULL DEFAULT 0,
+    processed_for_pulse INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS processed_urls (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    url TEXT NOT NULL UNIQUE,
+    processed_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+);
+CREATE TABLE IF NOT EXISTS article_categories (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    article_id INTEGER NOT NULL REFERENCES articles (id),
+    category_id INTEGER NOT NULL REFERENCES categories (id)
+);
+CREATE INDEX IF NOT EXISTS article_categories_article_id ON article_categories (article_id);
+CREATE TABLE IF NOT EXISTS pulses (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    title TEXT,
+    blurb TEXT,
+    content TEXT,
+    category_id INTEGER REFERENCES categories (id),
+    slug TEXT,
+    published_date TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+);
+CREATE TABLE IF NOT EXISTS weekly_pulses (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    title TEXT,
+    blurb TEXT,
+    content TEXT,
+    slug TEXT,
+    published_date TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+);
+"""
+BOOLEAN_COLUMNS = {
+    'articles': {'is_categorized', 'processed_for_pulse'},
+}
+# Resources that can be embedded in a select, e.g. 'article_categories(category_id)'
+# on articles: table -> {child table: foreign key column in the child}
+EMBEDDED_RESOURCES = {
+    'articles': {'article_categories': 'article_id'},
+    'categories': {'article_categories': 'category_id', 'pulses': 'category_id'},
+}
+
+_IDENTIFIER = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+
+def _identifier(name):
+    """Validates a table or column name before it is put into SQL."""
+    name = name.strip()
+    if not _IDENTIFIER.match(name):
+        raise ValueError(f"Invalid identifier: {name!r}")
+    return name
+
+
+def _split_columns(columns):
+    """Splits a PostgREST select list on top-level commas."""
+    parts, depth, current = [], 0, ''
+    for char in columns:
+        if char == ',' and depth == 0:
+            parts.append(current.strip())
+            current = ''
+            continue
+        depth += char == '('
+        depth -= char == ')'
+        current += char
+    if current.strip():
+        parts.append(current.strip())
+    return parts
+
+
+class LocalResponse:
+    def __init__(self, data):
+        self.data = data
+
+
+class LocalQuery:
+    """
+    A PostgREST-style query builder over SQLite, covering the subset of
+    the supabase-py API the backend uses: select (with one level of
+    embedded child resources), insert, upsert, update and delete, the eq, neq, gt,
+    gte, lt, lte and in_ filters, order, limit and execute().
+    """
+
+    def __init__(self, client, table):
+        self._client = client
+        self._table = _identifier(table)
+        self._action = 'select'
+        self._columns = '*'
+        self._payload = None
+        self._on_conflict = None
+        self._filters = []
+        self._order = []
+        self._limit = None
+
+    # --- Actions ---
+    def select(self, columns='*', **kwargs):
+        self._action, self._columns = 'select', columns
+        return self
+
+    def insert(self, rows, **kwargs):
+        self._action, self._payload = 'insert', rows
+        return self
+
+    def upsert(self, rows, on_conflict=None, **kwargs):
+        self._action, self._payload, self._on_conflict = 'upsert', rows, on_conflict or 'id'
+        return self
+
+    def update(self, values, **kwargs):
+        self._action, self._payload = 'update', values
+        return self
+
+    def delete(self, **kwargs):
+        self._action = 'delete'
+        return self
+
+    # --- Filters and modifiers ---
+    def _filter(self, column, operator, value):
+        self._filters.append((_identifier(column), operator, value))
+        return self
+
+    def eq(self, column, value):
+        return self._filter(column, '=', value)
+
+    def neq(self, column, value):
+        return self._filter(column, '!=', value)
+
+    def gt(self, column, value):
+        return self._filter(column, '>', value)
+
+    def gte(self, column, value):
+        return self._filter(column, '>=', value)
+
+    def lt(self, column, value):
+        return self._filter(column, '<', value)
+
+    def lte(self, column, value):
+        return self._filter(column, '<=', value)
+
+    def in_(self, column, values):
+        return self._filter(column, 'IN', list(values))
+
+    def order(self, column, desc=False, **kwargs):
+        self._order.append((_identifier(column), 'DESC' if desc else 'ASC'))
+        return self
+
+    def limit(self, size, **kwargs):
+        self._limit = int(size)
+        return self
+
+    # --- Execution ---
+    def _coerce(self, column, value):
+        # PostgREST filter values arrive as strings: 'true'/'false' for
+        # booleans, and timestamps are sometimes double-quoted.
+        if isinstance(value, str):
+            if len(value) >= 2 and value[0] == value[-1] == '"':
+                value = value[1:-1]
+            if column in BOOLEAN_COLUMNS.get(self._table, ()) and value in ('true', 'false'):
+                return 1 if value == 'true' else 0
+        if isinstance(value, (dict, list)):
+            return json.dumps(value)
+        return value
+
+    def _where(self):
+        clauses, params = [], []
+        for column, operator, value in self._filters:
+            if operator == 'IN':
+                if not value:
+                    clauses.append('0')
+                    continue
+                clauses.append(f"{column} IN ({','.join('?' * len(value))})")
+                params.extend(self._coerce(column, v) for v in value)
+            else:
+                clauses.append(f'{column} {operator} ?')
+                params.append(self._coerce(column, value))
+        return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', params
+
+    def _to_dict(self, table, cursor, row):
+        record = dict(zip([d[0] for d in cursor.description], row))
+        for column in BOOLEAN_COLUMNS.get(table, ()):
+            if column in record and record[column] is not None:
+                record[column] = bool(record[column])
+        return record
+
+    def _select(self, conn):
+        plain, embedded = [], []
+        for part in _split_columns(self._columns):
+            match = re.match(r'^(\w+)\s*\((.*)\)$', part)
+            if match:
+                embedded.append((_identifier(match.group(1)), match.group(2)))
+            else:
+                plain.append(part if part == '*' else _identifier(part))
+        if embedded and '*' not in plain and 'id' not in plain:
+            plain.append('id')
+            drop_id = True
+        else:
+            drop_id = False
+
+        where, params = self._where()
+        sql = f"SELECT {', '.join(plain) or '*'} FROM {self._table}{where}"
+        if self._order:
+            sql += ' ORDER BY ' + ', '.join(f'{column} {direction}' for column, direction in self._order)
+        if self._limit is not None:
+            sql += f' LIMIT {self._limit}'
+        cursor = conn.execute(sql, params)
+        rows = [self._to_dict(self._table, cursor, row) for row in cursor.fetchall()]
+
+        for child_table, child_columns in embedded:
+            foreign_key = EMBEDDED_RESOURCES.get(self._table, {}).get(child_table)
+            if foreign_key is None:
+                raise ValueError(f"No relationship between '{self._table}' and '{child_table}' in the local schema.")
+            child_plain = [c if c == '*' else _identifier(c) for c in _split_columns(child_columns)] or ['*']
+            select_list = ', '.join(child_plain) if '*' in child_plain or foreign_key in child_plain \
+                else ', '.join(child_plain + [foreign_key])
+            children = {}
+            ids = [row['id'] for row in rows]
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i + 500]
+                cursor = conn.execute(
+                    f"SELECT {select_list} FROM {child_table} WHERE {foreign_key} IN ({','.join('?' * len(chunk))})",
+                    chunk
+                )
+                for child_row in cursor.fetchall():
+                    child = self._to_dict(child_table, cursor, child_row)
+                    parent_id = child[foreign_key] if '*' in child_plain or foreign_key in child_plain else child.pop(foreign_key)
+                    children.setdefault(parent_id, []).append(child)
+            for row in rows:
+                row[child_table] = children.get(row['id'], [])
+
+        if drop_id:
+            for row in rows:
+                row.pop('id', None)
+        return rows
+
+    def _write_rows(self, conn, rows, on_conflict=None):
+        written = []
+        for row in rows:
+            columns = [_identifier(column) for column in row]
+            values = [self._coerce(column, row[column]) for column in columns]
+            sql = f"INSERT INTO {self._table} ({', '.join(columns)}) VALUES ({','.join('?' * len(columns))})"
+            if on_conflict:
+                conflict_columns = [_identifier(c) for c in on_conflict.split(',')]
+                updates = [c for c in columns if c not in conflict_columns]
+                sql += f" ON CONFLICT ({', '.join(conflict_columns)}) DO " + (
+                    'UPDATE SET ' + ', '.join(f'{c} = excluded.{c}' for c in updates) if updates else 'NOTHING'
+                )
+            cursor = conn.execute(sql + ' RETURNING *', values)
+            written.extend(self._to_dict(self._table, cursor, r) for r in cursor.fetchall())
+        return written
+
+    def _update(self, conn):
+        columns = [_identifier(column) for column in self._payload]
+        where, params = self._where()
+        cursor = conn.execute(
+            f"UPDATE {self._table} SET {', '.join(f'{c} = ?' for c in columns)}{where} RETURNING *",
+            [self._coerce(c, self._payload[c]) for c in columns] + params
+        )
+        return [self._to_dict(self._table, cursor, row) for row in cursor.fetchall()]
+
+    def _delete(self, conn):
+        where, params = self._where()
+        cursor = conn.execute(f"DELETE FROM {self._table}{where} RETURNING *", params)
+        return [self._to_dict(self._table, cursor, row) for row in cursor.fetchall()]
+
+    def execute(self):
+        with self._client._lock, self._client._conn as conn:
+            if self._action == 'select':
+                data = self._select(conn)
+            elif self._action in ('insert', 'upsert'):
+                rows = self._payload if isinstance(self._payload, list) else [self._payload]
+                data = self._write_rows(conn, rows, self._on_conflict if self._action == 'upsert' else None)
+            elif self._action == 'delete':
+                data = self._delete(conn)
+            else:
+                data = self._update(conn)
+        return LocalResponse(data)
+
+
+class LocalClient:
+    """
+    Local stand-in for the Supabase client, backed by one SQLite file.
+
+    Implements table(name) with the query subset described in LocalQuery,
+    so the backend runs unchanged without credentials or network access.
+    Constraint violations raise sqlite3 errors, as PostgREST errors would.
+    """
+
+    def __init__(self, path=LOCAL_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = open_connection(path)
+        with self._conn:
+            self._conn.executescript(LOCAL_SCHEMA)
+
+    def table(self, name):
+        return LocalQuery(self, name)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# --- Shared client ---
+# One client per process, created on first use, so every module (and every
+# pipeline stage) shares its connection pool.
+_client = None
+_client_lock = threading.Lock()
+
+
+def _create_client():
+    if STORAGE_BACKEND == 'local':
+        print(f"Using local storage at: {LOCAL_DB_PATH}")
+        return LocalClient()
+    if STORAGE_BACKEND != 'supabase':
+        raise ValueError(f"Unknown STORAGE_BACKEND '{STORAGE_BACKEND}'. Use 'supabase' or 'local'.")
+
+    supabase_url = os.getenv("SUPABASE_URL")
+    supabase_key = os.getenv("SUPABASE_SERVICE_KEY")
+    if not supabase_url or not supabase_key:
+        raise ValueError("Supabase credentials must be set in the .env file.")
+    from supabase import create_client  # Deferred: not needed for local storage
+    return create_client(supabase_url, supabase_key)
+
+
+def get_client():
+    """Returns the Supabase client, or the local SQLite stand-in when STORAGE_BACKEND=local."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = _create_client()
+    return _client
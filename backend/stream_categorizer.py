@@ -0,0 +1,108 @@
+# backend/stream_categorizer.py
+
+import queue
+import threading
+import time
+import numpy as np
+from categorize_articles import load_categories, categorize_batch
+from embedding_utils import get_or_create_collection, ARTICLES_COLLECTION
+
+# --- Streaming categorization ---
+# Articles waiting to be categorized; when the queue is full the scraper
+# blocks, so a slow embedder throttles scraping instead of piling up memory.
+STREAM_QUEUE_SIZE = 64
+# A micro-batch is processed once it has this many articles, or once its
+# first article has waited this long, whichever comes first.
+STREAM_BATCH_SIZE = 16
+STREAM_MAX_WAIT_SECONDS = 2.0
+
+_STOP = object()
+
+
+class StreamingCategorizer:
+    """
+    Categorizes articles while they are still being scraped.
+
+    The discovery stage put()s each stored article on a bounded queue; one
+    worker thread drains it in micro-batches and runs categorize_batch on
+    them. Network-bound scraping and CPU-bound embedding then overlap, and
+    each article is categorized seconds after it is stored.
+
+    Use as a context manager, or call close() to flush the queue and stop
+    the worker.
+    """
+
+    def __init__(self, similarity_threshold=0.4, batch_size=STREAM_BATCH_SIZE, max_wait=STREAM_MAX_WAIT_SECONDS, queue_size=STREAM_QUEUE_SIZE):
+        self.similarity_threshold = similarity_threshold
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.categorized = 0
+        self.failed = 0
+        self.latencies = []  # Seconds from put() to written, per article
+        self._category_objects, self._category_embeddings_np = load_categories()
+        self._articles_collection = get_or_create_collection(ARTICLES_COLLECTION)
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._worker = threading.Thread(target=self._run, name='stream-categorizer', daemon=True)
+        self._worker.start()
+
+    def put(self, article):
+        """Queues a stored article row (with its id) for categorization; blocks while the queue is full."""
+        self._queue.put((article, time.monotonic()))
+
+    def _next_batch(self):
+        """Returns (batch, stop) after waiting for the first item and up to max_wait for more."""
+        first = self._queue.get()
+        if first is _STOP:
+            return [], True
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self):
+        stop = False
+        while not stop:
+            batch, stop = self._next_batch()
+            if not batch:
+                continue
+            try:
+                self.categorized += categorize_batch(
+                    [article for article, _ in batch],
+                    self._category_objects, self._category_embeddings_np, self._articles_collection,
+                    similarity_threshold=self.similarity_threshold, batch_size=self.batch_size
+                )
+            except Exception as e:
+                # These articles stay uncategorized and are picked up by the next full categorization.
+                print(f'  Error categorizing a batch of {len(batch)} streamed articles: {e}')
+                self.failed += len(batch)
+                continue
+            finished = time.monotonic()
+            self.latencies.extend(finished - queued for _, queued in batch)
+
+    def close(self):
+        """Waits for every queued article to be categorized, then stops the worker."""
+        self._queue.put(_STOP)
+        self._worker.join()
+        if self.latencies:
+            p50, p95 = np.percentile(self.latencies, [50, 95])
+            print(f'Streamed categorization: {self.categorized} articles, '
+                  f'latency from storage to categorized p50 {p50:.1f}s, p95 {p95:.1f}s.')
+        if self.failed:
+            print(f'Warning: {self.failed} streamed articles could not be categorized.')
+        return self.categorized
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,30 @@
+# backend/tests/test_embedding_backends.py
+
+import importlib.util
+import unittest
+
+from embedding_utils import DRIFT_CHECK_TEXTS, MIN_BACKEND_COSINE, _load_model, check_backend_drift, onnx_backend_available
+
+HAS_SENTENCE_TRANSFORMERS = importlib.util.find_spec('sentence_transformers') is not None
+
+
+@unittest.skipUnless(HAS_SENTENCE_TRANSFORMERS, 'sentence-transformers is not installed')
+class BackendDriftTest(unittest.TestCase):
+    """The faster backends must stay within MIN_BACKEND_COSINE of the fp32 reference on fixed sentences."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.reference = _load_model('torch')
+
+    def test_int8_vectors_match_fp32(self):
+        min_cosine = check_backend_drift(_load_model('torch-int8'), reference_model=self.reference, texts=DRIFT_CHECK_TEXTS)
+        self.assertGreaterEqual(min_cosine, MIN_BACKEND_COSINE)
+
+    @unittest.skipUnless(onnx_backend_available(), 'optimum[onnxruntime] is not installed')
+    def test_onnx_vectors_match_fp32(self):
+        min_cosine = check_backend_drift(_load_model('onnx'), reference_model=self.reference, texts=DRIFT_CHECK_TEXTS)
+        self.assertGreaterEqual(min_cosine, MIN_BACKEND_COSINE)
+
+
+if __name__ == '__main__':
+    unittest.main()
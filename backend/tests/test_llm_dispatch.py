@@ -0,0 +1,88 @@
+# backend/tests/test_llm_dispatch.py
+
+import time
+import unittest
+
+from fake_llm import FakeGenerativeModel, FakeRateLimitError
+from llm_dispatch import LLMDispatcher, TokenBucket, estimate_tokens
+
+
+class FlakyModel(FakeGenerativeModel):
+    """Fails the first `failures` calls with `error`, then answers like the fake."""
+
+    def __init__(self, failures, error):
+        super().__init__()
+        self.failures = failures
+        self.error = error
+        self.attempts = 0
+
+    def generate_content(self, prompt):
+        self.attempts += 1
+        if self.attempts <= self.failures:
+            raise self.error
+        return super().generate_content(prompt)
+
+
+class OneSecondWindowModel(FakeGenerativeModel):
+    """Counts its rpm over one second instead of a minute, so quota tests run in seconds."""
+
+    RATE_LIMIT_WINDOW = 1.0
+
+
+def prompts(count, length=200):
+    return {i: f"### Article Title: Story {i}\n" + 'x' * length for i in range(count)}
+
+
+class LLMDispatcherTest(unittest.TestCase):
+
+    def test_stays_within_the_models_rpm(self):
+        # The fake raises 429 on the 11th call within its window; the dispatcher
+        # must never trigger it, also past the first window. A bucket that
+        # starts with a full window of requests lets a second window's worth
+        # through on top.
+        model = OneSecondWindowModel(rpm=10)
+        dispatcher = LLMDispatcher(model, rpm=9 * 60, tpm=1_000_000, max_concurrency=4, max_retries=1)
+        results = list(dispatcher.map(prompts(25)))
+        self.assertEqual([error for _, _, error in results], [None] * 25)
+        self.assertEqual(model.calls, 25)
+
+    def test_rpm_bucket_paces_requests(self):
+        dispatcher = LLMDispatcher(FakeGenerativeModel(), tpm=1_000_000, max_concurrency=4)
+        dispatcher.request_bucket = TokenBucket(600, capacity=2)  # 10 requests/s after a burst of 2
+        start = time.monotonic()
+        results = list(dispatcher.map(prompts(12)))
+        self.assertGreaterEqual(time.monotonic() - start, 0.9)
+        self.assertTrue(all(error is None for _, _, error in results))
+
+    def test_tpm_bucket_paces_tokens(self):
+        batch = prompts(5)
+        total_tokens = sum(estimate_tokens(prompt) for prompt in batch.values())
+        dispatcher = LLMDispatcher(FakeGenerativeModel(), rpm=1000, max_concurrency=4)
+        dispatcher.token_bucket = TokenBucket(6000, capacity=100)  # 100 tokens/s after a burst of 100
+        start = time.monotonic()
+        list(dispatcher.map(batch))
+        self.assertGreaterEqual(time.monotonic() - start, (total_tokens - 100) / 100 - 0.1)
+
+    def test_retries_rate_limit_errors(self):
+        model = FlakyModel(failures=2, error=FakeRateLimitError(retry_after=0.05))
+        dispatcher = LLMDispatcher(model, rpm=1000, tpm=1_000_000, max_retries=3)
+        self.assertIn('TITLE:', dispatcher.generate('### Article Title: Retried story'))
+        self.assertEqual(model.attempts, 3)
+
+    def test_gives_up_after_max_retries(self):
+        model = FlakyModel(failures=5, error=FakeRateLimitError(retry_after=0.01))
+        dispatcher = LLMDispatcher(model, rpm=1000, tpm=1_000_000, max_retries=2)
+        with self.assertRaises(FakeRateLimitError):
+            dispatcher.generate('prompt')
+        self.assertEqual(model.attempts, 2)
+
+    def test_does_not_retry_other_errors(self):
+        model = FlakyModel(failures=1, error=ValueError('bad request'))
+        dispatcher = LLMDispatcher(model, rpm=1000, tpm=1_000_000)
+        with self.assertRaises(ValueError):
+            dispatcher.generate('prompt')
+        self.assertEqual(model.attempts, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,201 @@
+# backend/tiered_fetcher.py
+
+import re
+import threading
+import time
+from extraction_profiles import get_profile, needs_selenium, normalize_domain
+from local_state import LOCAL_STATE_PATH, open_connection
+from selenium.common.exceptions import WebDriverException
+from scraper import scrape_article_content
+
+HTTP_TIER = 'http'
+SELENIUM_TIER = 'selenium'
+
+# --- Escalation policy ---
+# An HTTP result is a failure, and the page is retried in headless Chrome,
+# when it is blocked or empty, when it is a bot challenge or "enable
+# JavaScript" shell, or when no content selector matched and the <body>
+# text is shorter than the domain's min_text_chars (see
+# extraction_profiles). A short page whose article element matched is a
+# short article, not a failure.
+CHALLENGE_MARKERS = re.compile(
+    r'just a moment|checking your browser|verify (that )?you are (a )?human|are you a robot|'
+    r'enable javascript|javascript is (disabled|required)|attention required|captcha',
+    re.IGNORECASE
+)
+# Challenge pages and JS shells are short; longer text that mentions these
+# words is an article about them.
+CHALLENGE_PAGE_MAX_CHARS = 1500
+# A domain moves to the Selenium tier after this many consecutive HTTP
+# failures, so later pages skip the doomed HTTP attempt.
+PROMOTE_AFTER_HTTP_FAILURES = 2
+# Every this many pages, a Selenium-tier domain is probed with plain HTTP;
+# after this many consecutive successful probes it moves back to HTTP.
+HTTP_PROBE_INTERVAL = 10
+DEMOTE_AFTER_HTTP_SUCCESSES = 2
+
+
+class DomainTierStore:
+    """
+    Persists, per domain, which fetch tier to use and the outcome history
+    that decides it.
+
+    A domain seen for the first time starts on the tier its extraction
+    profile suggests (Selenium if `needs_selenium`, HTTP otherwise). From
+    then on repeated HTTP failures promote it to Selenium and successful
+    HTTP probes demote it again, so the tier follows what the site
+    currently needs rather than a static list.
+    """
+
+    def __init__(self, path=LOCAL_STATE_PATH):
+        self._lock = threading.Lock()
+        self._conn = open_connection(path)
+        with self._conn:
+            self._conn.execute(
+                '''CREATE TABLE IF NOT EXISTS domain_tiers (
+                       domain TEXT PRIMARY KEY,
+                       tier TEXT NOT NULL,
+                       streak INTEGER NOT NULL,
+                       since_probe INTEGER NOT NULL,
+                       http_ok INTEGER NOT NULL,
+                       http_failed INTEGER NOT NULL,
+                       selenium_ok INTEGER NOT NULL,
+                       selenium_failed INTEGER NOT NULL,
+                       updated_at REAL NOT NULL
+                   )'''
+            )
+        self._states = {}
+        for row in self._conn.execute(
+            'SELECT domain, tier, streak, since_probe, http_ok, http_failed, selenium_ok, selenium_failed FROM domain_tiers'
+        ):
+            self._states[row[0]] = dict(zip(
+                ('tier', 'streak', 'since_probe', 'http_ok', 'http_failed', 'selenium_ok', 'selenium_failed'), row[1:]
+            ))
+
+    def _state(self, domain):
+        if domain not in self._states:
+            self._states[domain] = {
+                'tier': SELENIUM_TIER if needs_selenium(domain) else HTTP_TIER,
+                'streak': 0,
+                'since_probe': 0,
+                'http_ok': 0,
+                'http_failed': 0,
+                'selenium_ok': 0,
+                'selenium_failed': 0,
+            }
+        return self._states[domain]
+
+    def _save(self, domain, state):
+        with self._conn:
+            self._conn.execute(
+                '''INSERT OR REPLACE INTO domain_tiers
+                   (domain, tier, streak, since_probe, http_ok, http_failed, selenium_ok, selenium_failed, updated_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+                (domain, state['tier'], state['streak'], state['since_probe'], state['http_ok'],
+                 state['http_failed'], state['selenium_ok'], state['selenium_failed'], time.time())
+            )
+
+    def tier(self, url):
+        with self._lock:
+            return self._state(normalize_domain(url))['tier']
+
+    def plan(self, url):
+        """
+        Returns the tier to try first for a page: the domain's tier, except
+        that every HTTP_PROBE_INTERVAL-th page of a Selenium-tier domain is
+        tried over HTTP to see whether the site still needs a browser.
+        """
+        domain = normalize_domain(url)
+        with self._lock:
+            state = self._state(domain)
+            if state['tier'] == HTTP_TIER:
+                return HTTP_TIER
+            state['since_probe'] += 1
+            if state['since_probe'] >= HTTP_PROBE_INTERVAL:
+                state['since_probe'] = 0
+                return HTTP_TIER
+            return SELENIUM_TIER
+
+    def record(self, url, tier, success):
+        """Records the outcome of fetching a page with `tier` and moves the domain between tiers if needed."""
+        domain = normalize_domain(url)
+        with self._lock:
+            state = self._state(domain)
+            state[f"{tier}_{'ok' if success else 'failed'}"] += 1
+            if tier == HTTP_TIER:
+                if state['tier'] == HTTP_TIER:
+                    state['streak'] = 0 if success else state['streak'] + 1
+                    if state['streak'] >= PROMOTE_AFTER_HTTP_FAILURES:
+                        print(f"  Domain {domain} now fetched with Selenium after {state['streak']} failed HTTP attempts.")
+                        state['tier'], state['streak'] = SELENIUM_TIER, 0
+                else:
+                    state['streak'] = state['streak'] + 1 if success else 0
+                    if state['streak'] >= DEMOTE_AFTER_HTTP_SUCCESSES:
+                        print(f"  Domain {domain} now fetched over plain HTTP after {state['streak']} successful probes.")
+                        state['tier'], state['streak'] = HTTP_TIER, 0
+            self._save(domain, state)
+
+    def summary(self):
+        """Returns {tier: number of domains} over all known domains."""
+        with self._lock:
+            counts = {}
+            for state in self._states.values():
+                counts[state['tier']] = counts.get(state['tier'], 0) + 1
+            return counts
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def _http_result_ok(url, content, matched_selector):
+    if not content:
+        return False
+    if len(content) < CHALLENGE_PAGE_MAX_CHARS and CHALLENGE_MARKERS.search(content):
+        return False
+    return matched_selector is not None or len(content) >= get_profile(url)['min_text_chars']
+
+
+def fetch_article(url, tier_store, driver_pool=None, learned_store=None):
+    """
+    Fetches an article's text with the cheapest tier that works.
+
+    Plain HTTP is tried first unless the domain is on the Selenium tier;
+    if it fails, is blocked (e.g. 403), or returns a challenge page or an
+    unrendered shell (see the escalation policy above), the page is
+    retried in a pooled headless Chrome. Each outcome is recorded in
+    `tier_store`. Without a usable driver pool only HTTP is used.
+
+    Returns:
+        str or None: The article text.
+    """
+    content = None
+    tried_http = driver_pool is None or tier_store.plan(url) == HTTP_TIER
+    if tried_http:
+        content, matched_selector = scrape_article_content(url, learned_store=learned_store, return_match=True)
+        http_ok = _http_result_ok(url, content, matched_selector)
+        tier_store.record(url, HTTP_TIER, http_ok)
+        if http_ok or driver_pool is None:
+            return content
+
+    # Each worker checks out its own driver; a WebDriver is not thread-safe.
+    try:
+        with driver_pool.driver() as chrome_driver:
+            if chrome_driver is None:
+                # Chrome could not be started; settle for what plain HTTP returns.
+                return content if tried_http else scrape_article_content(url, learned_store=learned_store)
+            print(f"  Escalating {url} to Selenium." if tried_http else f"  Fetching {url} with Selenium.")
+            selenium_content = scrape_article_content(
+                url, chrome_driver=chrome_driver, force_selenium_for_this_url=True, learned_store=learned_store
+            )
+    except TimeoutError as e:
+        # Every driver stayed busy; don't hold the worker any longer.
+        print(f"  {e} Falling back to plain HTTP for {url}.")
+        return content if tried_http else scrape_article_content(url, learned_store=learned_store)
+    except WebDriverException as e:
+        # The pool has already discarded the broken driver; the next page gets a fresh one.
+        print(f"  Chrome failed on {url}; replacing its driver: {e.msg or type(e).__name__}")
+        tier_store.record(url, SELENIUM_TIER, False)
+        return content if tried_http else scrape_article_content(url, learned_store=learned_store)
+    tier_store.record(url, SELENIUM_TIER, bool(selenium_content))
+    return selenium_content or content